@@ -0,0 +1,133 @@
+import itertools
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import ANALYTICS_TTL_SECONDS
+from metering import metered_fragment
+from utils import fmt_seconds
+
+# ------------------------------ Task History Frame
+# One row per task, live and archived: group (categorical), completed and the
+# creation / completion times (NaT when unset). Everything below works on
+# whole columns.
+_FIELDS = ("group", "completed", "timestamp", "completed_time")
+
+_HOUR, _DAY = 3600, 86400
+_DURATION_BINS = [0, _HOUR, 4 * _HOUR, _DAY, 3 * _DAY, 7 * _DAY, 14 * _DAY, 30 * _DAY, 90 * _DAY, np.inf]
+_DURATION_LABELS = ["< 1h", "1-4h", "4h-1d", "1-3d", "3-7d", "1-2w", "2w-1m", "1-3m", "> 3m"]
+_AGE_BINS = [0, _DAY, 3 * _DAY, 7 * _DAY, 14 * _DAY, 30 * _DAY, 90 * _DAY, np.inf]
+_AGE_LABELS = ["< 1d", "1-3d", "3-7d", "1-2w", "2w-1m", "1-3m", "> 3m"]
+_TOP_GROUPS = 10
+
+def task_frame(rows):
+    groups, done, created, finished = [], [], [], []
+    for _, info in rows:
+        groups.append(info.get("group", "General"))
+        done.append(info.get("completed", False))
+        created.append(info.get("timestamp"))
+        finished.append(info.get("completed_time"))
+    return pd.DataFrame({
+        "group": pd.Categorical(groups),
+        "completed": np.array(done, dtype=bool),
+        "created": pd.to_datetime(pd.Series(created, dtype=object)),
+        "finished": pd.to_datetime(pd.Series(finished, dtype=object)),
+    })
+
+@st.cache_data(ttl=ANALYTICS_TTL_SECONDS, max_entries=64, show_spinner="Loading task history…")
+def task_history(_store, nickname, version):
+    # version (the session's write count) moves a session past the cached
+    # frame as soon as it writes; other sessions see it within the TTL.
+    rows = itertools.chain(_store.list_tasks(nickname, fields=_FIELDS), _store.list_archived(nickname, fields=_FIELDS))
+    return task_frame(rows)
+
+# ------------------------------ Measures
+def throughput(df, freq):
+    # Tasks completed per period ("D" or "W"), empty periods included.
+    periods = df["finished"].dropna().dt.to_period(freq)
+    if periods.empty:
+        return pd.Series(dtype="int64")
+    counts = periods.value_counts()
+    index = pd.period_range(counts.index.min(), counts.index.max(), freq=freq)
+    counts = counts.reindex(index, fill_value=0)
+    counts.index = counts.index.to_timestamp()
+    return counts
+
+def durations(df):
+    # Seconds from creation to completion, per completed task.
+    return (df["finished"] - df["created"]).dt.total_seconds().dropna().clip(lower=0)
+
+def duration_histogram(seconds):
+    buckets = pd.cut(seconds, _DURATION_BINS, labels=_DURATION_LABELS, right=False)
+    return buckets.value_counts(sort=False)
+
+def pending_ages(df, now):
+    pending = df.loc[~df["completed"] & df["created"].notna(), ["group", "created"]]
+    return pending["group"], (now - pending["created"]).dt.total_seconds().clip(lower=0)
+
+def backlog_table(groups, ages):
+    by_group = ages.groupby(groups, observed=True)
+    table = pd.DataFrame({"Pending": by_group.size(), "Median Age": by_group.median(), "Oldest": by_group.max()})
+    table = table.sort_values("Oldest", ascending=False)
+    table["Median Age"] = table["Median Age"].map(fmt_seconds)
+    table["Oldest"] = table["Oldest"].map(fmt_seconds)
+    return table.rename_axis("Group").reset_index()
+
+def aging_histogram(groups, ages):
+    # Pending tasks per age bucket, stacked by group (the largest groups, the
+    # rest as "Other").
+    top = groups.value_counts().index[:_TOP_GROUPS]
+    groups = groups.astype(object).where(groups.isin(top), "Other")
+    buckets = pd.cut(ages, _AGE_BINS, labels=_AGE_LABELS, right=False)
+    return pd.crosstab(buckets.rename("Age"), groups.rename("Group")).reindex(_AGE_LABELS, fill_value=0)
+
+# ------------------------------ Analytics Tab
+_WINDOWS = {"Last 30 days": 30, "Last 90 days": 90, "Last year": 365, "All time": None}
+
+@st.fragment
+@metered_fragment("analytics")
+def render_analytics(store, nickname):
+    # Its own fragment, so the controls rerun only this tab.
+    if not st.toggle("📊 Show analytics", key="analytics_on",
+                     help="Reads your whole task history, then keeps it cached for a while."):
+        return
+    df = task_history(store, nickname, st.session_state.get("write_seq", 0))
+    if df.empty:
+        st.info("No tasks to analyze yet.")
+        return
+    now = pd.Timestamp(datetime.utcnow())
+    seconds = durations(df)
+
+    c = st.columns(4)
+    c[0].metric("Tasks", f"{len(df):,}")
+    c[1].metric("Completed", f"{int(df['completed'].sum()):,}")
+    c[2].metric("Median time to complete", fmt_seconds(seconds.median() if len(seconds) else None))
+    c[3].metric("90th percentile", fmt_seconds(seconds.quantile(0.9) if len(seconds) else None))
+
+    st.markdown("### 📅 Completed Tasks")
+    c1, c2 = st.columns(2)
+    freq = c1.radio("Per", ["Day", "Week"], horizontal=True, key="analytics_freq")
+    window = c2.selectbox("Period", list(_WINDOWS), index=1, key="analytics_window")
+    done = throughput(df, freq[0])
+    days = _WINDOWS[window]
+    if days is not None:
+        done = done[done.index >= now.normalize() - pd.Timedelta(days=days)]
+    if done.empty:
+        st.info("No tasks completed in this period.")
+    else:
+        st.bar_chart(done.rename("Completed"))
+
+    st.markdown("### ⏱️ Time to Complete")
+    if seconds.empty:
+        st.info("No completed tasks yet.")
+    else:
+        st.bar_chart(duration_histogram(seconds).rename("Tasks"))
+
+    st.markdown("### ⌛ Pending Backlog")
+    groups, ages = pending_ages(df, now)
+    if ages.empty:
+        st.info("🎉 No pending tasks.")
+        return
+    st.dataframe(backlog_table(groups, ages), hide_index=True, width="stretch")
+    st.markdown("#### Pending Tasks by Age")
+    st.bar_chart(aging_histogram(groups, ages))
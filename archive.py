@@ -0,0 +1,24 @@
+import argparse
+from datetime import datetime, timedelta
+from config import ARCHIVE_AFTER_DAYS
+
+# ------------------------------ Archive Job
+# Moves tasks completed more than N days ago into the user's archive, where
+# they are kept with per-group monthly counts and durations. Run it from
+# cron or a scheduler:
+#   python archive.py <nickname> [<nickname> ...] [--days N]
+def archive_user(store, nickname, days=ARCHIVE_AFTER_DAYS, progress=None):
+    before = datetime.utcnow() - timedelta(days=days)
+    return store.archive_tasks(nickname, before, progress=progress)
+
+if __name__ == "__main__":
+    from storage import get_store
+
+    parser = argparse.ArgumentParser(description="Archive tasks completed more than N days ago.")
+    parser.add_argument("nicknames", nargs="+")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS)
+    args = parser.parse_args()
+    store = get_store()
+    for nick in args.nicknames:
+        n = archive_user(store, nick, args.days, progress=lambda done: print(f"  {done} archived"))
+        print(f"{nick}: archived {n} tasks completed before {args.days} days ago")
@@ -1,35 +1,142 @@
+import base64, hashlib, hmac, logging, threading, time
 import streamlit as st
+from collections import OrderedDict
 from datetime import datetime
-from utils import hash_password
+from utils import hash_password, verify_password, needs_rehash
+from storage import get_store
+from config import SESSION_SECRET, SESSION_TTL_SECONDS, SESSION_VERIFY_CACHE_SECONDS
 
-def login(db):
+# ------------------------------ Session Tokens
+# "<nickname, base64>.<epoch>.<expires>.<signature>", HMAC-SHA256 signed with
+# SESSION_SECRET and kept in the "session" query parameter. The epoch is the
+# user's session_epoch when the token was issued; logging out bumps it
+# (TaskStore.revoke_sessions), which retires every token the user holds, so a
+# copied URL stops working. Verified tokens are remembered for
+# SESSION_VERIFY_CACHE_SECONDS, so reruns and refreshes skip the user read:
+# other workers honour a revocation within that time. Without a secret no
+# tokens are issued, as a per-process key would not hold across workers or
+# restarts.
+_SECRET = SESSION_SECRET.encode()
+_VERIFIED_MAX = 1024
+_verified = OrderedDict()   # token -> (nickname, remember_until)
+_lock = threading.Lock()
+logger = logging.getLogger(__name__)
+
+def tokens_enabled():
+    return bool(_SECRET) and SESSION_TTL_SECONDS > 0
+
+def _sign(payload):
+    mac = hmac.new(_SECRET, payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(mac).decode().rstrip("=")
+
+def issue_token(nickname, epoch=0, now=None):
+    if not tokens_enabled():
+        raise ValueError("session tokens need TODO_SESSION_SECRET and a positive TODO_SESSION_TTL_SECONDS")
+    nick = base64.urlsafe_b64encode(nickname.encode()).decode().rstrip("=")
+    payload = f"{nick}.{int(epoch)}.{int((now or time.time()) + SESSION_TTL_SECONDS)}"
+    return f"{payload}.{_sign(payload)}"
+
+def verify_token(token, now=None):
+    # The token's nickname, or None if it is forged, malformed, expired or
+    # revoked.
+    if not tokens_enabled():
+        return None
+    now = now or time.time()
+    with _lock:
+        hit = _verified.get(token)
+        if hit is not None and hit[1] > now:
+            return hit[0]
+    try:
+        nick, epoch, expires, sig = token.split(".")
+        epoch, expires = int(epoch), int(expires)
+        # Bytes: compare_digest rejects non-ASCII str with a TypeError.
+        if expires <= now or not hmac.compare_digest(sig.encode(), _sign(f"{nick}.{epoch}.{expires}").encode()):
+            return None
+        nickname = base64.urlsafe_b64decode(nick + "=" * (-len(nick) % 4)).decode()
+    except (ValueError, UnicodeDecodeError):
+        return None
+    user = get_store().get_user(nickname)
+    if user is None or user.get("session_epoch", 0) != epoch:
+        return None
+    with _lock:
+        _verified[token] = (nickname, min(expires, now + SESSION_VERIFY_CACHE_SECONDS))
+        _verified.move_to_end(token)
+        while len(_verified) > _VERIFIED_MAX:
+            _verified.popitem(last=False)
+    return nickname
+
+def _sign_in(nickname, epoch=0):
+    st.session_state.authenticated = True
+    st.session_state.nickname = nickname
+    if tokens_enabled():
+        st.query_params["session"] = issue_token(nickname, epoch)
+
+def resume_session():
+    # Signs a fresh session (e.g. after a browser refresh) back in from its URL.
+    token = st.query_params.get("session")
+    if not token or not tokens_enabled():
+        return False
+    try:
+        nickname = verify_token(token)
+    except Exception:
+        # Keeps the token: the store may be back on the next refresh.
+        logger.warning("could not verify a session token", exc_info=True)
+        return False
+    if nickname is None:
+        del st.query_params["session"]
+        return False
+    st.session_state.authenticated = True
+    st.session_state.nickname = nickname
+    return True
+
+def end_session(nickname):
+    # Revokes all of the user's tokens; a failure here must not block the logout.
+    if tokens_enabled():
+        try:
+            get_store().revoke_sessions(nickname)
+        except Exception:
+            logger.warning("could not revoke the sessions of %s", nickname, exc_info=True)
+    with _lock:
+        for token in [t for t, (nick, _) in _verified.items() if nick == nickname]:
+            del _verified[token]
+    if "session" in st.query_params:
+        del st.query_params["session"]
+
+# ------------------------------ Login / Register
+def _upgrade_hash(store, nickname, pwd, stored):
+    # Rehashes at the current cost; a failure here must not block the login.
+    if needs_rehash(stored):
+        try:
+            store.set_password_hash(nickname, hash_password(pwd))
+        except Exception:
+            logger.warning("could not rehash the password of %s", nickname, exc_info=True)
+
+def login():
     with st.form("login_form", clear_on_submit=False):
         nick_in = st.text_input("Nickname", key="login_nick")
         pwd_in  = st.text_input("Password", type="password", key="login_pwd")
         if st.form_submit_button("Login"):
-            user = db.collection("users").document(nick_in).get()
-            if user.exists and user.to_dict().get("password_hash") == hash_password(pwd_in):
-                st.session_state.authenticated = True
-                st.session_state.nickname = nick_in
+            store = get_store()
+            user = store.get_user(nick_in)
+            if user is not None and verify_password(pwd_in, user.get("password_hash")):
+                _upgrade_hash(store, nick_in, pwd_in, user["password_hash"])
+                _sign_in(nick_in, user.get("session_epoch", 0))
                 st.success(f"Welcome back, {nick_in}!")
                 st.rerun()
             else:
                 st.error("❌ Invalid nickname or password.")
 
-def register(db):
+def register():
     with st.form("register_form", clear_on_submit=False):
         nick_new = st.text_input("Choose a Nickname", key="reg_nick")
         pwd_new  = st.text_input("Choose a Password", type="password", key="reg_pwd")
         if st.form_submit_button("Create Account"):
-            if nick_new and pwd_new and not db.collection("users").document(nick_new).get().exists:
-                db.collection("users").document(nick_new).set({
-                    "password_hash": hash_password(pwd_new),
-                    "created_at": datetime.utcnow()
-                })
-                db.collection("tasks").document(nick_new).set({"init": True})
-                st.session_state.authenticated = True
-                st.session_state.nickname = nick_new
+            if nick_new and pwd_new and get_store().create_user(nick_new, {
+                "password_hash": hash_password(pwd_new),
+                "created_at": datetime.utcnow()
+            }):
+                _sign_in(nick_new)
                 st.success(f"🎉 Account created. Welcome, {nick_new}!")
                 st.rerun()
             else:
-                st.error("❌ Nickname taken or invalid inputs.")
\ No newline at end of file
+                st.error("❌ Nickname taken or invalid inputs.")
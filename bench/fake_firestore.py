@@ -0,0 +1,371 @@
+import copy, itertools, threading
+from collections import namedtuple
+from google.api_core.exceptions import Aborted, Conflict, NotFound
+from google.cloud.firestore_v1 import DELETE_FIELD, Increment
+
+# ------------------------------ In-process Fake Firestore
+# Implements the slice of the google-cloud-firestore client API that
+# storage/firestore.py uses, and counts what a real project would bill:
+# documents read (min 1 per query, 1 per 1000 entries per aggregation),
+# queries issued and writes committed.
+
+AggregationResult = namedtuple("AggregationResult", "alias value read_time")
+DocumentChange = namedtuple("DocumentChange", "type document")
+ChangeType = namedtuple("ChangeType", "name")
+
+_auto_ids = itertools.count(1)
+
+class Metrics:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.docs_read = 0
+        self.queries = 0
+        self.writes = 0
+
+    def as_dict(self):
+        return {"docs_read": self.docs_read, "queries": self.queries, "writes": self.writes}
+
+def _copy(data):
+    return {k: (copy.deepcopy(v) if isinstance(v, (dict, list)) else v) for k, v in data.items()}
+
+def _apply(dst, changes, nested):
+    # nested=True: set(merge=True) semantics; False: update() field paths.
+    for key, value in changes.items():
+        if nested and isinstance(value, dict):
+            _apply(dst.setdefault(key, {}), value, True)
+            continue
+        parts = [key] if nested else key.split(".")
+        target = dst
+        for p in parts[:-1]:
+            target = target.setdefault(p, {})
+        if value is DELETE_FIELD:
+            target.pop(parts[-1], None)
+        elif isinstance(value, Increment):
+            target[parts[-1]] = target.get(parts[-1], 0) + value.value
+        else:
+            target[parts[-1]] = copy.deepcopy(value)
+
+class DocumentSnapshot:
+    def __init__(self, reference, data, fields=None):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        if data is not None and fields is not None:
+            data = {k: v for k, v in data.items() if k in fields}
+        self._data = _copy(data) if data is not None else None
+
+    def to_dict(self):
+        return _copy(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return self._data.get(field) if self._data else None
+
+class FakeClient:
+    def __init__(self):
+        self.collections = {}   # collection path tuple -> {doc_id: data}
+        self.metrics = Metrics()
+        self.lock = threading.RLock()
+        self.watchers = {}      # collection path tuple -> [Watch]
+
+    def collection(self, name):
+        return CollectionReference(self, (name,))
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def transaction(self, max_attempts=5):
+        return Transaction(self, max_attempts)
+
+    def get_all(self, references, field_paths=None, transaction=None):
+        for ref in references:
+            yield ref.get(field_paths, transaction=transaction)
+
+    def _docs(self, path):
+        return self.collections.setdefault(path, {})
+
+    def _write(self, coll_path, doc_id, fn):
+        with self.lock:
+            docs = self._docs(coll_path)
+            before = docs.get(doc_id)
+            after = fn(_copy(before) if before is not None else None)
+            if after is None:
+                docs.pop(doc_id, None)
+            else:
+                docs[doc_id] = after
+            self.metrics.writes += 1
+            watchers = list(self.watchers.get(coll_path, ()))
+        for w in watchers:
+            w._notify(doc_id, before, after)
+
+    def seed(self, coll_path, doc_id, data):
+        # Direct insert for benchmark setup; not metered.
+        self._docs(tuple(coll_path))[doc_id] = data
+
+class DocumentReference:
+    def __init__(self, client, coll_path, doc_id):
+        self._client = client
+        self._coll_path = coll_path
+        self.id = doc_id
+
+    @property
+    def parent(self):
+        return CollectionReference(self._client, self._coll_path)
+
+    def collection(self, name):
+        return CollectionReference(self._client, self._coll_path + (self.id, name))
+
+    def get(self, field_paths=None, transaction=None):
+        with self._client.lock:
+            self._client.metrics.docs_read += 1
+            data = self._client._docs(self._coll_path).get(self.id)
+            if transaction is not None:
+                transaction._reads.append((self._doc_rows, _copy(data) if data is not None else None))
+            return DocumentSnapshot(self, data, field_paths)
+
+    def _doc_rows(self):
+        data = self._client._docs(self._coll_path).get(self.id)
+        return _copy(data) if data is not None else None
+
+    def set(self, data, merge=False):
+        def fn(cur):
+            out = cur if (merge and cur is not None) else {}
+            _apply(out, data, True)
+            return out
+        self._client._write(self._coll_path, self.id, fn)
+
+    def create(self, data):
+        def fn(cur):
+            if cur is not None:
+                raise Conflict(f"Document already exists: {self.id}")
+            out = {}
+            _apply(out, data, True)
+            return out
+        self._client._write(self._coll_path, self.id, fn)
+
+    def update(self, data):
+        def fn(cur):
+            if cur is None:
+                raise NotFound(f"No document to update: {self.id}")
+            _apply(cur, data, False)
+            return cur
+        self._client._write(self._coll_path, self.id, fn)
+
+    def delete(self):
+        self._client._write(self._coll_path, self.id, lambda cur: None)
+
+_OPS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<":  lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">":  lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "in": lambda a, b: a in b,
+}
+
+class Query:
+    def __init__(self, client, coll_path, filters=(), orders=(), limit=None, after=None, fields=None):
+        self._client = client
+        self._coll_path = coll_path
+        self._filters = filters
+        self._orders = orders
+        self._limit = limit
+        self._after = after
+        self._fields = fields
+
+    def _with(self, **kw):
+        args = dict(filters=self._filters, orders=self._orders, limit=self._limit,
+                    after=self._after, fields=self._fields)
+        args.update(kw)
+        return Query(self._client, self._coll_path, **args)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._with(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction="ASCENDING"):
+        return self._with(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count):
+        return self._with(limit=count)
+
+    def start_after(self, document_fields_or_snapshot):
+        cursor = document_fields_or_snapshot
+        if isinstance(cursor, DocumentSnapshot):
+            cursor = dict(cursor.to_dict(), __name__=cursor.id)
+        return self._with(after=cursor)
+
+    def select(self, field_paths):
+        return self._with(fields=set(field_paths))
+
+    def _matches(self):
+        docs = self._client._docs(self._coll_path)
+        rows = [
+            (doc_id, data) for doc_id, data in docs.items()
+            if all(_OPS[op](data.get(f), v) for f, op, v in self._filters)
+        ]
+        # "__name__" orders by document id, as in Firestore.
+        value = lambda r, f: r[0] if f == "__name__" else r[1].get(f)
+        rows.sort(key=lambda r: r[0])
+        for field, direction in reversed(self._orders):
+            rows.sort(key=lambda r: value(r, field), reverse=direction == "DESCENDING")
+        if self._after is not None and self._orders:
+            def after(r):
+                for field, direction in self._orders:
+                    a, b = value(r, field), self._after.get(field)
+                    if a != b:
+                        return (a < b) if direction == "DESCENDING" else (a > b)
+                return False
+            rows = [r for r in rows if after(r)]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        return rows
+
+    def stream(self, transaction=None):
+        with self._client.lock:
+            rows = self._matches()
+            if transaction is not None:
+                transaction._reads.append((self._matches, [(i, _copy(d)) for i, d in rows]))
+            self._client.metrics.queries += 1
+            self._client.metrics.docs_read += max(1, len(rows))
+            snaps = [
+                DocumentSnapshot(DocumentReference(self._client, self._coll_path, doc_id), data, self._fields)
+                for doc_id, data in rows
+            ]
+        return iter(snaps)
+
+    def get(self):
+        return list(self.stream())
+
+    def count(self, alias=None):
+        return AggregationQuery(self, alias or "field_1")
+
+    def on_snapshot(self, callback):
+        return Watch(self, callback)
+
+class CollectionReference(Query):
+    def __init__(self, client, coll_path):
+        super().__init__(client, coll_path)
+        self.id = coll_path[-1]
+
+    @property
+    def parent(self):
+        if len(self._coll_path) == 1:
+            return None
+        return DocumentReference(self._client, self._coll_path[:-2], self._coll_path[-2])
+
+    def document(self, document_id=None):
+        return DocumentReference(self._client, self._coll_path, document_id or f"auto{next(_auto_ids):016d}")
+
+    def add(self, document_data):
+        ref = self.document()
+        ref.set(document_data)
+        return None, ref
+
+class AggregationQuery:
+    def __init__(self, query, alias):
+        self._query = query
+        self._alias = alias
+
+    def get(self):
+        client = self._query._client
+        with client.lock:
+            n = len(self._query._matches())
+            client.metrics.queries += 1
+            client.metrics.docs_read += 1 + n // 1000
+        return [[AggregationResult(self._alias, n, None)]]
+
+class WriteBatch:
+    MAX_WRITES = 500
+
+    def __init__(self, client):
+        self._client = client
+        self._ops = []
+
+    def set(self, reference, document_data, merge=False):
+        self._ops.append(lambda: reference.set(document_data, merge=merge))
+
+    def create(self, reference, document_data):
+        self._ops.append(lambda: reference.create(document_data))
+
+    def update(self, reference, field_updates):
+        self._ops.append(lambda: reference.update(field_updates))
+
+    def delete(self, reference):
+        self._ops.append(reference.delete)
+
+    def __len__(self):
+        return len(self._ops)
+
+    def commit(self):
+        if len(self._ops) > self.MAX_WRITES:
+            raise ValueError(f"maximum {self.MAX_WRITES} writes allowed per request")
+        client = self._client
+        with client.lock:
+            saved = {path: dict(docs) for path, docs in client.collections.items()}
+            try:
+                for op in self._ops:
+                    op()
+            except Exception:
+                client.collections = saved
+                raise
+        return []
+
+class Transaction(WriteBatch):
+    # Optimistic stand-in for a Firestore transaction, driven by
+    # @firestore.transactional: the commit fails with Aborted (and the
+    # decorator retries) if anything read through it has changed since.
+    def __init__(self, client, max_attempts=5):
+        super().__init__(client)
+        self._max_attempts = max_attempts
+        self._read_only = False
+        self._id = None
+        self._reads = []    # (re-read, value seen)
+
+    @property
+    def in_progress(self):
+        return self._id is not None
+
+    def _clean_up(self):
+        self._ops, self._reads, self._id = [], [], None
+
+    def _begin(self, retry_id=None):
+        self._id = next(_auto_ids)
+
+    def _rollback(self):
+        self._clean_up()
+
+    def _commit(self):
+        with self._client.lock:
+            if any(read() != seen for read, seen in self._reads):
+                self._clean_up()
+                raise Aborted("Transaction lock timeout or contention")
+            self.commit()
+        self._clean_up()
+        return []
+
+class Watch:
+    def __init__(self, query, callback):
+        self._query = query
+        self._callback = callback
+        client = query._client
+        with client.lock:
+            client.watchers.setdefault(query._coll_path, []).append(self)
+            snaps = list(query.stream())
+        callback(snaps, [DocumentChange(ChangeType("ADDED"), s) for s in snaps], None)
+
+    def _notify(self, doc_id, before, after):
+        client = self._query._client
+        ref = DocumentReference(client, self._query._coll_path, doc_id)
+        kind = "REMOVED" if after is None else ("ADDED" if before is None else "MODIFIED")
+        client.metrics.docs_read += 1
+        snap = DocumentSnapshot(ref, after if after is not None else before)
+        self._callback([], [DocumentChange(ChangeType(kind), snap)], None)
+
+    def unsubscribe(self):
+        watchers = self._query._client.watchers.get(self._query._coll_path, [])
+        if self in watchers:
+            watchers.remove(self)
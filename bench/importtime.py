@@ -0,0 +1,90 @@
+import argparse, json, os, subprocess, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ------------------------------ Startup Import Profile
+# Runs `python -X importtime` over the modules main.py loads before anyone
+# has logged in, and reports per-module self/cumulative import time.
+#
+#   python -m bench.importtime                  # login-page import set
+#   python -m bench.importtime --modules ui tasks --top 30 --json out.json
+#
+# Exits non-zero when a module that should stay deferred until first use
+# (Firestore, plotting, dataframes) is imported by the login page: either by
+# the modules above, or on the script thread while main.py renders the login
+# page headlessly with the environment's config. What the store warm-up
+# (TODO_FIRESTORE_WARMUP) loads on its own thread is listed separately.
+LOGIN_PAGE_MODULES = ["streamlit", "config", "storage", "auth", "tasks", "ui", "snapshot",
+                      "live", "pages", "metering", "styles"]
+DEFERRED = ["firebase_admin", "google.cloud.firestore", "matplotlib", "seaborn", "pandas"]
+
+_RENDER = """
+import importlib.abc, json, sys, threading
+from streamlit.testing.v1 import AppTest
+loaded = {}
+class Spy(importlib.abc.MetaPathFinder):
+    def find_spec(self, name, path=None, target=None):
+        loaded.setdefault(name, threading.current_thread().name)
+sys.meta_path.insert(0, Spy())
+AppTest.from_file("main.py", default_timeout=60).run()
+for t in threading.enumerate():
+    if t.name == "store-warmup":
+        t.join(60)
+print(json.dumps(loaded))
+"""
+
+def login_page_modules():
+    # {module: importing thread} for modules first imported while main.py
+    # renders the login page, the store warm-up included.
+    proc = subprocess.run([sys.executable, "-c", _RENDER], cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode:
+        raise SystemExit(proc.stderr)
+    return json.loads(proc.stdout.splitlines()[-1])
+
+def _deferred(loaded):
+    return [m for m in DEFERRED if m in loaded]
+
+def profile(modules):
+    code = "; ".join(f"import {m}" for m in modules)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode:
+        raise SystemExit(proc.stderr)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({"module": name.strip(), "self_us": int(self_us), "cumulative_us": int(cumulative_us)})
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-module import time for the app's cold start.")
+    parser.add_argument("--modules", nargs="+", default=LOGIN_PAGE_MODULES)
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    rows = profile(args.modules)
+    total_us = sum(r["self_us"] for r in rows)
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for r in sorted(rows, key=lambda r: -r["cumulative_us"])[:args.top]:
+        print(f"{r['cumulative_us'] / 1000:>14.1f} {r['self_us'] / 1000:>9.1f}  {r['module']}")
+    print(f"{len(rows)} modules, {total_us / 1000:.1f} ms total")
+
+    leaked = _deferred({r["module"] for r in rows})
+    threads = login_page_modules() if args.modules == LOGIN_PAGE_MODULES else {}
+    rendered = _deferred({m for m, t in threads.items() if t != "store-warmup"})
+    warmed = _deferred({m for m, t in threads.items() if t == "store-warmup"})
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"modules": args.modules, "total_us": total_us, "deferred_loaded": leaked,
+                       "deferred_rendered": rendered, "deferred_warmed": warmed, "rows": rows}, fh, indent=2)
+    if leaked and args.modules == LOGIN_PAGE_MODULES:
+        print(f"deferred modules imported at startup: {', '.join(leaked)}")
+    if warmed:
+        print(f"loaded in the background by the store warm-up: {', '.join(warmed)}")
+    if rendered:
+        print(f"deferred modules imported rendering the login page: {', '.join(rendered)}")
+    if (leaked and args.modules == LOGIN_PAGE_MODULES) or rendered:
+        sys.exit(1)
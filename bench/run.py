@@ -0,0 +1,187 @@
+import argparse, json, os, platform, random, subprocess, sys, time, tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest
+from bench.fake_firestore import FakeClient
+from storage import set_store
+from storage.cache import cache_stats, invalidate
+from storage.firestore import FirestoreStore
+from utils import hash_password, format_task_timestamp
+import config
+
+# ------------------------------ Benchmark Driver
+# Drives main.py headlessly through AppTest against an in-process fake
+# Firestore and records, per scenario and task count: wall time, documents
+# read, queries issued, writes and peak Python memory above the pre-rerun
+# baseline (tracemalloc).
+#
+#   python -m bench.run --sizes 10 1000 10000 100000 --out bench_results.json
+#
+# Mode flags (TODO_LIVE_TASKS, TODO_PAGED_TASKS, TODO_PAGE_SIZE,
+# TODO_TASK_CACHE_TTL_SECONDS, ...) are read from the environment as usual and
+# recorded in the output. The fake sits behind the task cache as the real
+# store would, so reads served from it are not counted as docs_read; cache
+# hits and misses are recorded per scenario.
+
+MAIN = os.path.join(ROOT, "main.py")
+NICKNAME, PASSWORD = "bench_user", "bench_pw"
+
+def seed(client, n_tasks, n_groups, n_other_users=3):
+    rng = random.Random(n_tasks)
+    now = datetime.utcnow()
+    users = [NICKNAME] + [f"other_user_{i}" for i in range(n_other_users)]
+    for nick in users:
+        # Entries cached from the previous size's client.
+        invalidate(nick)
+    for nick in users:
+        client.seed(("users",), nick, {"password_hash": hash_password(PASSWORD), "created_at": now})
+        client.seed(("tasks",), nick, {"init": True})
+        count = n_tasks if nick == NICKNAME else min(n_tasks, 50)
+        for i in range(count):
+            created = now - timedelta(minutes=rng.randint(1, 60 * 24 * 365))
+            doc = {
+                "task": f"Task {i}",
+                "group": f"Group {rng.randrange(n_groups):03d}",
+                "comment": f"Synthetic task {i} for {nick}",
+                "completed": rng.random() < 0.4,
+                "timestamp": created,
+                "created_str": format_task_timestamp(created),
+            }
+            if doc["completed"]:
+                doc["completed_time"] = created + timedelta(minutes=rng.randint(1, 60 * 24 * 30))
+            client.seed(("tasks", nick, "items"), f"{nick}-{i:07d}", doc)
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class Recorder:
+    def __init__(self, client, n_tasks):
+        self.client = client
+        self.n_tasks = n_tasks
+        self.results = []
+
+    def measure(self, scenario, action):
+        self.client.metrics.reset()
+        cache_before = cache_stats()
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        at = action()
+        wall_ms = (time.perf_counter() - start) * 1000
+        _, peak = tracemalloc.get_traced_memory()
+        peak -= baseline
+        if at.exception:
+            raise RuntimeError(f"{scenario} raised: {at.exception[0].message}")
+        row = {"tasks": self.n_tasks, "scenario": scenario, "wall_ms": round(wall_ms, 2),
+               "peak_kb": round(peak / 1024, 1)}
+        row.update(self.client.metrics.as_dict())
+        cache_after = cache_stats()
+        row["cache_hits"] = (cache_after["hits"] + cache_after["shared_hits"]
+                             - cache_before["hits"] - cache_before["shared_hits"])
+        row["cache_misses"] = cache_after["misses"] - cache_before["misses"]
+        self.results.append(row)
+        print(f"{self.n_tasks:>7} {scenario:<16} {row['wall_ms']:>10.1f} ms "
+              f"{row['docs_read']:>8} reads {row['queries']:>5} queries {row['cache_hits']:>4} hits "
+              f"{row['peak_kb']:>10.1f} KiB")
+        return at
+
+def _open_group(at, group):
+    # AppTest does not keep expander state between runs, so reopen the
+    # expanders under test before every interaction.
+    at.session_state[f"exp_pending_{group}"] = True
+    at.session_state[f"exp_completed_{group}"] = True
+
+def _button(at, prefix):
+    return next(b for b in at.button if b.key and b.key.startswith(prefix))
+
+def run_size(n_tasks, n_groups, timeout):
+    client = FakeClient()
+    seed(client, n_tasks, n_groups)
+    store = FirestoreStore(db=client)
+    store.rebuild_stats(NICKNAME)
+    set_store(store)
+    rec = Recorder(client, n_tasks)
+    at = AppTest.from_file(MAIN, default_timeout=timeout)
+    at.run()
+
+    def login():
+        at.text_input(key="login_nick").input(NICKNAME)
+        at.text_input(key="login_pwd").input(PASSWORD)
+        return next(b for b in at.button if b.label == "Login").click().run()
+    rec.measure("login", login)
+    rec.measure("initial_render", at.run)
+
+    stats = store.load_stats(NICKNAME)
+    groups = sorted(stats["groups"], key=lambda g: -(stats["groups"][g]["total"] - stats["groups"][g]["completed"]))
+    group = groups[0] if groups else None
+    if group is None:
+        return rec.results
+
+    _open_group(at, group)
+    rec.measure("open_group", at.run)
+
+    def toggle():
+        _open_group(at, group)
+        chk = next(c for c in at.checkbox if c.key and c.key.startswith("chk_"))
+        return chk.check().run()
+    rec.measure("checkbox_toggle", toggle)
+
+    _open_group(at, group)
+    at.run()
+    doc_id = _button(at, "edit_btn_").key[len("edit_btn_"):]
+    at.session_state[f"edit_{doc_id}"] = True
+    _open_group(at, group)
+    at.run()
+
+    def edit_save():
+        _open_group(at, group)
+        at.session_state[f"edit_{doc_id}"] = True
+        at.text_input(key=f"comm_{doc_id}").input("Edited in benchmark")
+        return at.button(key=f"save_{doc_id}").click().run()
+    rec.measure("edit_save", edit_save)
+
+    _open_group(at, group)
+    at.run()
+    try:
+        del_btn = _button(at, f"del_group_completed_{group}")
+    except StopIteration:
+        return rec.results
+
+    def bulk_delete():
+        _open_group(at, group)
+        return del_btn.click().run()
+    rec.measure("bulk_delete", bulk_delete)
+    return rec.results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-rerun reads and latency benchmark for main.py.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000, 100000])
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--out", default=os.path.join(ROOT, "bench_results.json"))
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    results = []
+    for n in args.sizes:
+        results.extend(run_size(n, args.groups, args.timeout))
+    tracemalloc.stop()
+
+    report = {
+        "commit": _git_commit(),
+        "created": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "backend": "firestore-fake",
+        "config": {k: getattr(config, k) for k in dir(config) if k.isupper()},
+        "groups": args.groups,
+        "results": results,
+    }
+    with open(args.out, "w") as fh:
+        json.dump(report, fh, indent=2, default=str)
+    print(f"wrote {args.out}")
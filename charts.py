@@ -0,0 +1,90 @@
+import io, math, threading
+from collections import OrderedDict
+from html import escape
+from config import CHART_RENDERER, CHART_CACHE_SIZE
+
+# seaborn's "muted" palette, first two colours.
+PIE_COLORS = ("#4878d0", "#ee854a")
+
+# ------------------------------ Chart Cache
+# Finished images keyed on (renderer, group, completed, remaining), shared by
+# every session in the process and evicted least-recently-used first.
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+def _cached(key, render):
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    image = render()
+    with _lock:
+        _cache[key] = image
+        _cache.move_to_end(key)
+        while len(_cache) > CHART_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return image
+
+def status_pie(group, completed, remaining):
+    # PNG bytes (matplotlib) or an SVG string, both accepted by st.image.
+    if CHART_RENDERER == "svg":
+        return _cached(("svg", group, completed, remaining), lambda: _pie_svg(group, completed, remaining))
+    return _cached(("png", group, completed, remaining), lambda: _pie_png(group, completed, remaining))
+
+# ------------------------------ Renderers
+def _pie_png(group, completed, remaining):
+    # A bare Figure is never registered with pyplot, so nothing is left open
+    # once the bytes are written.
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(4, 4), facecolor="white")
+    ax = fig.subplots()
+    ax.pie([completed, remaining],
+           labels=["Completed", "Remaining"],
+           autopct="%1.0f%%",
+           startangle=90,
+           colors=PIE_COLORS,
+           wedgeprops={"edgecolor": "white", "linewidth": 1.5})
+    ax.set_title(f"{group} Tasks", pad=12)
+    ax.axis("equal")
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=100, bbox_inches="tight")
+    return buf.getvalue()
+
+def _pie_svg(group, completed, remaining, size=320):
+    total = completed + remaining
+    height = size + 60
+    cx, cy, r = size / 2, size / 2 + 30, size / 2 - 20
+    parts = [
+        f"<svg xmlns='http://www.w3.org/2000/svg' width='{size}' height='{height}' viewBox='0 0 {size} {height}' "
+        f"font-family='sans-serif'>",
+        "<rect width='100%' height='100%' fill='white'/>",
+        f"<text x='{cx}' y='20' text-anchor='middle' font-size='14'>{escape(str(group))} Tasks</text>",
+    ]
+    slices = [(v, color) for v, color in zip((completed, remaining), PIE_COLORS) if v > 0]
+    # Counter-clockwise from twelve o'clock, like ax.pie(startangle=90).
+    start = -math.pi / 2
+    for value, color in slices:
+        frac = value / total
+        end = start - 2 * math.pi * frac
+        if len(slices) == 1:
+            parts.append(f"<circle cx='{cx}' cy='{cy}' r='{r}' fill='{color}' stroke='white' stroke-width='1.5'/>")
+        else:
+            x1, y1 = cx + r * math.cos(start), cy + r * math.sin(start)
+            x2, y2 = cx + r * math.cos(end), cy + r * math.sin(end)
+            large = 1 if frac > 0.5 else 0
+            parts.append(
+                f"<path d='M{cx},{cy} L{x1:.2f},{y1:.2f} A{r},{r} 0 {large} 0 {x2:.2f},{y2:.2f} Z' "
+                f"fill='{color}' stroke='white' stroke-width='1.5'/>"
+            )
+        mid = (start + end) / 2
+        px, py = cx + 0.6 * r * math.cos(mid), cy + 0.6 * r * math.sin(mid)
+        parts.append(f"<text x='{px:.1f}' y='{py:.1f}' text-anchor='middle' dominant-baseline='middle' "
+                     f"font-size='13' fill='white'>{frac * 100:.0f}%</text>")
+        start = end
+    for i, (label, color) in enumerate(zip(("Completed", "Remaining"), PIE_COLORS)):
+        x = size / 2 - 100 + i * 110
+        parts.append(f"<rect x='{x}' y='{height - 22}' width='12' height='12' fill='{color}'/>")
+        parts.append(f"<text x='{x + 18}' y='{height - 12}' font-size='12'>{label}</text>")
+    parts.append("</svg>")
+    return "".join(parts)
@@ -0,0 +1,100 @@
+import os
+
+# ------------------------------ Runtime Config
+# Every knob is read from the environment, like FIREBASE_KEY_JSON.
+def _flag(name, default=False):
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+# Storage backend: "firestore" (default) or "sqlite" for a local indexed file.
+STORAGE_BACKEND = os.getenv("TODO_STORAGE", "firestore").strip().lower()
+SQLITE_PATH = os.getenv("TODO_SQLITE_PATH", "todo.db")
+
+# Once the login page is drawn, create the store on a background thread and
+# open the Firestore client's connection with a probe read, so the login query
+# does not pay for it (storage/__init__.py, firebase_utils.py). The login page
+# itself still renders without firebase_admin (bench/importtime.py).
+FIRESTORE_WARMUP = _flag("TODO_FIRESTORE_WARMUP", True)
+
+# Password hashing cost (utils.hash_password): PBKDF2-SHA256 iterations for
+# new hashes. Weaker existing hashes are upgraded when their user logs in.
+PASSWORD_ITERATIONS = int(os.getenv("TODO_PASSWORD_ITERATIONS", "200000"))
+
+# Signed session tokens kept in the page URL (auth.py), so a browser refresh
+# signs the user back in without a password check. The secret must be the same
+# on every worker; left empty, or with a lifetime of 0, no tokens are issued
+# and a refresh shows the login page. Logging out revokes the user's tokens;
+# other workers may accept one for up to SESSION_VERIFY_CACHE_SECONDS after.
+SESSION_SECRET = os.getenv("TODO_SESSION_SECRET", "")
+SESSION_TTL_SECONDS = int(os.getenv("TODO_SESSION_TTL_SECONDS", str(12 * 3600)))
+SESSION_VERIFY_CACHE_SECONDS = float(os.getenv("TODO_SESSION_VERIFY_CACHE_SECONDS", "60"))
+
+# Keep each session's tasks current through a Firestore on_snapshot listener
+# instead of re-reading the items collection on every rerun.
+LIVE_TASKS = _flag("TODO_LIVE_TASKS")
+LIVE_WAIT_SECONDS = float(os.getenv("TODO_LIVE_WAIT_SECONDS", "2"))
+
+# Rows rendered per group page, and whether to skip the full per-rerun
+# snapshot and fetch each open group's page straight from Firestore.
+PAGE_SIZE = int(os.getenv("TODO_PAGE_SIZE", "25"))
+PAGED_TASKS = _flag("TODO_PAGED_TASKS")
+
+# Firestore operation metering (metering.py): per-rerun log line, a read
+# budget warning threshold (0 disables it) and the opt-in sidebar panel.
+METER_FIRESTORE = _flag("TODO_METER_FIRESTORE", True)
+READ_BUDGET = int(os.getenv("TODO_READ_BUDGET", "500"))
+# Also estimate the bytes read and written (the "kib" columns). Off by default:
+# sizing walks every document of every read.
+METER_BYTES = _flag("TODO_METER_BYTES")
+DEBUG_PANEL = _flag("TODO_DEBUG_PANEL")
+
+# Sidebar pie chart: "matplotlib" PNG or the lightweight "svg" renderer, and
+# how many finished images the process-wide LRU keeps.
+CHART_RENDERER = os.getenv("TODO_CHART_RENDERER", "matplotlib").strip().lower()
+CHART_CACHE_SIZE = int(os.getenv("TODO_CHART_CACHE_SIZE", "256"))
+
+# Bulk deletes: documents per chunk (one transaction each, leaving room under
+# Firestore's 500-write limit for the stats update) and retries per failed
+# chunk. Chunks run one after another (storage/bulk.py).
+BULK_CHUNK_SIZE = int(os.getenv("TODO_BULK_CHUNK_SIZE", "450"))
+BULK_RETRIES = int(os.getenv("TODO_BULK_RETRIES", "3"))
+
+# Threads shared by all sessions for running a render's independent reads
+# concurrently (storage/executor.py); 1 runs them one after another.
+QUERY_WORKERS = int(os.getenv("TODO_QUERY_WORKERS", "8"))
+
+# Process-wide cache of each user's task rows and counts (storage/cache.py),
+# shared by all their sessions: seconds an entry lives (0 disables the cache)
+# and the most task rows held across users.
+TASK_CACHE_TTL_SECONDS = float(os.getenv("TODO_TASK_CACHE_TTL_SECONDS", "30"))
+TASK_CACHE_MAX_ROWS = int(os.getenv("TODO_TASK_CACHE_MAX_ROWS", "200000"))
+# Shared tier for multi-process deployments (storage/shared_cache.py):
+# "redis://host:6379/0" or "sqlite:///path/cache.db"; empty keeps the cache
+# per process.
+SHARED_CACHE_URL = os.getenv("TODO_SHARED_CACHE_URL", "").strip()
+
+# Write-behind: queue checkbox toggles and comment edits per session and
+# commit them as one batch on Apply, or once the oldest is this many seconds
+# old (0 waits for Apply). Off (the default) writes each change immediately:
+# Streamlit has no hook for a closed tab, so changes still queued then are lost.
+WRITE_BEHIND = _flag("TODO_WRITE_BEHIND")
+WRITE_DELAY_SECONDS = float(os.getenv("TODO_WRITE_DELAY_SECONDS", "5"))
+
+# How often the sidebar counts rerun on their own to catch up with edits made
+# in the group fragments; 0 (the default) refreshes them on full reruns only,
+# as a timer reruns every open tab, idle or not. The unsaved-changes bar reruns
+# on its own only while the session has changes queued.
+STATUS_REFRESH_SECONDS = float(os.getenv("TODO_STATUS_REFRESH_SECONDS", "0"))
+QUEUE_REFRESH_SECONDS = float(os.getenv("TODO_QUEUE_REFRESH_SECONDS", "2"))
+
+# Archive (archive.py): completed tasks older than this many days move out of
+# the live collection. A chunk writes each task twice plus its monthly
+# summaries, hence a third of the bulk chunk size.
+ARCHIVE_AFTER_DAYS = int(os.getenv("TODO_ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_CHUNK_SIZE = max(BULK_CHUNK_SIZE // 3, 1)
+
+# Analytics tab (analytics.py): how long a user's task history, read in full
+# (live and archived), is cached before it is read again.
+ANALYTICS_TTL_SECONDS = int(os.getenv("TODO_ANALYTICS_TTL_SECONDS", "600"))
@@ -1,6 +1,10 @@
-import os, json
+import os, json, logging, threading
 import firebase_admin
+import streamlit as st
 from firebase_admin import credentials, firestore
+from config import FIRESTORE_WARMUP
+
+logger = logging.getLogger(__name__)
 
 def load_firebase_credentials():
     try:
@@ -11,8 +15,25 @@ def load_firebase_credentials():
             raise ValueError("Firebase credentials not found.")
         return credentials.Certificate(json.loads(raw))
 
+# ------------------------------ Firestore Client
+# One client per process, shared by every session and rerun: credentials are
+# read once. With TODO_FIRESTORE_WARMUP (the default) the client is created in
+# the background while the login page is shown (storage.warm_up_store) and its
+# gRPC channel is opened by a probe read, so the first user query does not pay
+# for the connection and access-token setup.
+@st.cache_resource(show_spinner=False)
 def initialize_firebase():
     if not firebase_admin._apps:
         cred = load_firebase_credentials()
         firebase_admin.initialize_app(cred)
-    return firestore.client()
\ No newline at end of file
+    db = firestore.client()
+    if FIRESTORE_WARMUP:
+        threading.Thread(target=_warm_up, args=(db,), name="firestore-warmup", daemon=True).start()
+    return db
+
+def _warm_up(db):
+    # A missing document costs one read, the cheapest round trip there is.
+    try:
+        db.collection("users").document("__warmup__").get(timeout=10)
+    except Exception:
+        logger.warning("Firestore warm-up read failed", exc_info=True)
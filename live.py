@@ -0,0 +1,66 @@
+import threading, weakref
+import streamlit as st
+from snapshot import TaskSnapshot
+from config import LIVE_WAIT_SECONDS
+
+# ------------------------------ Live Task Index
+# One listener (Firestore on_snapshot) per logged-in session. The listener
+# thread applies added/modified/removed deltas to a private TaskSnapshot; each
+# rerun renders from a copy of it, so a rerun costs no reads.
+class LiveTasks:
+    def __init__(self, nickname, store):
+        self.nickname = nickname
+        self._snapshot = TaskSnapshot()
+        self._cond = threading.Condition()
+        self._version = 0
+        self._watch = store.watch_tasks(nickname, self._on_changes)
+
+    def _on_changes(self, changes):
+        with self._cond:
+            for kind, doc_id, info in changes:
+                if kind == "REMOVED":
+                    self._snapshot.remove(doc_id)
+                else:
+                    self._snapshot.upsert(doc_id, info)
+            self._version += 1
+            self._cond.notify_all()
+
+    def snapshot(self, since=0, timeout=LIVE_WAIT_SECONDS):
+        # Block until the listener has delivered something newer than `since`
+        # (the initial load, or the echo of a write made by this session).
+        with self._cond:
+            self._cond.wait_for(lambda: self._version > since, timeout=timeout)
+            return self._version, self._snapshot.copy()
+
+    def close(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+def attach_live_tasks(nickname, store):
+    live = st.session_state.get("live_tasks")
+    if live is not None and live.nickname == nickname:
+        return live
+    detach_live_tasks()
+    live = LiveTasks(nickname, store)
+    # The token lives only in session_state, so the listener is unsubscribed
+    # when Streamlit drops the session (tab closed or session expired).
+    token = type("LiveToken", (), {})()
+    weakref.finalize(token, live.close)
+    st.session_state.live_tasks = live
+    st.session_state.live_token = token
+    return live
+
+def detach_live_tasks():
+    live = st.session_state.pop("live_tasks", None)
+    st.session_state.pop("live_token", None)
+    if live is not None:
+        live.close()
+
+def live_snapshot(nickname, store):
+    live = attach_live_tasks(nickname, store)
+    seen = st.session_state.get("live_seen", 0)
+    wrote = st.session_state.pop("tasks_written", False)
+    version, snapshot = live.snapshot(since=seen if wrote else 0)
+    st.session_state.live_seen = version
+    return snapshot
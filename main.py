@@ -1,18 +1,26 @@
 import streamlit as st
-from firebase_utils import initialize_firebase
-from auth import login, register
-from tasks import render_pending, render_completed, add_new_task, delete_all_completed
+from storage import get_store, warm_up_store
+from auth import login, register, resume_session
+from tasks import render_pending, render_completed, add_new_task, render_transfer, render_queue_bar, flush_due, render_search, open_groups, prefetch_comments
+from mutations import apply_queued
 from ui import setup_page, sidebar
+from snapshot import load_snapshot
+from live import live_snapshot
+from pages import PagedTasks, open_pages, page_reads
+from storage.executor import gather
+from config import LIVE_TASKS, PAGED_TASKS, WRITE_BEHIND, FIRESTORE_WARMUP
 from styles import load_custom_styles
+from metering import begin_rerun, metered
+from stats import GroupIndex, with_archive
 
 setup_page()
-db = initialize_firebase()
+begin_rerun()
 
 if "authenticated" not in st.session_state:
     st.session_state.authenticated = False
     st.session_state.nickname = ""
 
-if not st.session_state.authenticated:
+if not st.session_state.authenticated and not resume_session():
     st.markdown(
         "<h1 style='text-align: center;'>Wickz Day Planner</h1>",
         unsafe_allow_html=True
@@ -22,23 +30,49 @@ if not st.session_state.authenticated:
     st.markdown("## 🔐 Login or Register")
 
     login_tab, register_tab = st.tabs(["Login", "Click Here to Register"])
-    with login_tab: login(db)
-    with register_tab: register(db)
+    with login_tab, metered("login"): login()
+    with register_tab, metered("register"): register()
+    if FIRESTORE_WARMUP:
+        # After the page is drawn, so loading the backend never delays it.
+        warm_up_store()
     st.stop()
 
-nickname  = st.session_state.nickname
-tasks_ref = db.collection("tasks").document(nickname).collection("items")
+nickname = st.session_state.nickname
+store    = get_store()
 
-pending_count, completed_count = sidebar(nickname, tasks_ref, db)
+with metered("flush_queue"):
+    flush_due(store, nickname)
+
+with metered("load_tasks"):
+    # Comments are re-read for the rows shown (tasks.load_comments).
+    st.session_state.pop("task_comments", None)
+    # The independent reads of a render go out together (storage/executor.py).
+    if LIVE_TASKS and store.can_watch:
+        task_view = live_snapshot(nickname, store)
+        archive = store.load_archive(nickname)
+    elif PAGED_TASKS:
+        # Along with the stats and archive totals, the page each open group
+        # is about to render.
+        wanted = open_pages(open_groups())
+        stats_doc, archive, *fetched = gather(lambda: store.load_stats(nickname),
+                                              lambda: store.load_archive(nickname),
+                                              *page_reads(store, nickname, wanted))
+        task_view = PagedTasks(store, nickname, stats_doc, dict(zip(wanted, fetched)))
+    else:
+        task_view, archive = gather(lambda: load_snapshot(store, nickname), lambda: store.load_archive(nickname))
+    stats = with_archive(apply_queued(task_view).stats(), archive)
+    if not PAGED_TASKS:
+        prefetch_comments(store, nickname, task_view, open_groups())
+
+with metered("sidebar"):
+    sidebar(nickname, task_view, archive)
 
 # ------------------------------ Add Task
 st.title("Wickz Day Planner")
 st.markdown("---")
 st.markdown("## 🔰 Create a New Task")
-all_docs = list(tasks_ref.stream())
-existing_groups = sorted({d.to_dict().get("group", "General") for d in all_docs if d.exists})
-if "General" not in existing_groups: existing_groups.append("General")
-existing_groups = sorted(existing_groups)
+groups = GroupIndex(stats)
+existing_groups = groups.names(include=["General"])
 
 with st.form("add_task_form", clear_on_submit=True):
     task_txt = st.text_input("Task Name")
@@ -48,22 +82,34 @@ with st.form("add_task_form", clear_on_submit=True):
     comment    = st.text_area("Task Description")
     submitted  = st.form_submit_button("Add Task")
     if submitted:
-        final_grp = group_cust.strip() or group_sel
+        # Reuse an existing group's spelling ("work" -> "Work").
+        final_grp = (groups.canonical(group_cust.strip()) or group_cust.strip()) or group_sel
         if task_txt.strip():
-            add_new_task(task_txt.strip(), final_grp, comment.strip(), tasks_ref)
+            with metered("add_new_task"):
+                add_new_task(task_txt.strip(), final_grp, comment.strip(), store, nickname)
             st.success(f"✅ Task added: {task_txt}, Group={final_grp}")
             st.rerun()
         else:
             st.error("❌ Task Name cannot be empty.")
 
+with metered("transfer"):
+    render_transfer(store, nickname)
+
 # ------------------------------ Toggle Tasks
 st.markdown("---")
 st.markdown("## 🔎 View Created Tasks")
 st.markdown(load_custom_styles(), unsafe_allow_html=True)
 
-pending_tab, completed_tab = st.tabs(["Pending Tasks", "Completed Tasks"])
-with pending_tab: render_pending(tasks_ref, db)
-with completed_tab: render_completed(tasks_ref,db)
+with metered("search"): render_search(store, nickname)
+if WRITE_BEHIND:
+    with metered("flush_queue"): render_queue_bar(store, nickname)
+pending_tab, completed_tab, analytics_tab = st.tabs(["Pending Tasks", "Completed Tasks", "Analytics"])
+with pending_tab, metered("render_pending"): render_pending(store, nickname, task_view)
+with completed_tab, metered("render_completed"): render_completed(store, nickname, task_view, archive)
+with analytics_tab, metered("analytics"):
+    # Imported here so pandas loads only for logged-in sessions.
+    from analytics import render_analytics
+    render_analytics(store, nickname)
 st.stop()
 
 #if view_completed:
@@ -0,0 +1,288 @@
+import contextvars, functools, logging, threading, time
+from contextlib import contextmanager
+from datetime import datetime
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from config import READ_BUDGET, METER_BYTES
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------ Operation Meter
+# Counts Firestore operations per (tag, op): calls, documents, latency and,
+# with TODO_METER_BYTES, approximate bytes. Reads are stream/get/count/listen, writes are
+# set/update/add/create/delete and batch commits (one write per op).
+READ_OPS = ("stream", "get", "count", "listen")
+
+class OpMeter:
+    def __init__(self, scope="process", run=None):
+        self._lock = threading.Lock()
+        self.rows = {}
+        self.scope = scope    # "app" or "fragment:<tag>" for a rerun's meter
+        self.run = run        # the script run it belongs to
+
+    def record(self, tag, op, docs=0, nbytes=0, ms=0.0):
+        with self._lock:
+            row = self.rows.setdefault((tag, op), [0, 0, 0, 0.0])
+            row[0] += 1; row[1] += docs; row[2] += nbytes; row[3] += ms
+
+    def table(self):
+        with self._lock:
+            items = sorted(self.rows.items(), key=lambda kv: -kv[1][1])
+        return [
+            {"tag": tag, "op": op, "calls": c, "docs": d, "kib": round(b / 1024, 1), "ms": round(ms, 1)}
+            for (tag, op), (c, d, b, ms) in items
+        ]
+
+    def totals(self):
+        reads = writes = nbytes = 0
+        ms = 0.0
+        with self._lock:
+            for (_, op), (_, d, b, t) in self.rows.items():
+                if op in READ_OPS: reads += d
+                else: writes += d
+                nbytes += b; ms += t
+        return {"reads": reads, "writes": writes, "kib": round(nbytes / 1024, 1), "ms": round(ms, 1)}
+
+# Process-wide totals, plus one meter per rerun bound to the script thread.
+process_meter = OpMeter()
+_rerun_meter = contextvars.ContextVar("rerun_meter", default=None)
+_tag = contextvars.ContextVar("op_tag", default="other")
+
+def _record(op, docs=0, nbytes=0, ms=0.0, tag=None):
+    tag = tag or _tag.get()
+    process_meter.record(tag, op, docs, nbytes, ms)
+    meter = _rerun_meter.get()
+    if meter is not None:
+        meter.record(tag, op, docs, nbytes, ms)
+
+@contextmanager
+def metered(tag):
+    token = _tag.set(tag)
+    try:
+        yield
+    finally:
+        _tag.reset(token)
+
+# ------------------------------ Per-rerun Reports
+# Every script run gets a meter: full reruns from main.py, fragment reruns
+# (which skip main.py) from their callbacks and fragment bodies. A run's
+# meter is reported (log line, budget check, usage panel) when the fragment
+# body finishes or, for a full rerun, when the next run begins.
+def _this_run():
+    # Streamlit replaces the context's cursor map on every run, full or
+    # fragment, so it identifies the run while a meter holds on to it.
+    ctx = get_script_run_ctx()
+    return ctx.cursors if ctx is not None else None
+
+def _fragment_run():
+    ctx = get_script_run_ctx()
+    return bool(ctx is not None and ctx.fragment_ids_this_run)
+
+def _run_meter(scope):
+    # This run's meter, closing out the previous run's first.
+    meter, run = st.session_state.get("op_meter"), _this_run()
+    if meter is None or meter.run is not run:
+        if meter is not None:
+            _finish_rerun(meter)
+        meter = OpMeter(scope, run)
+        st.session_state.op_meter = meter
+    _rerun_meter.set(meter)
+    return meter
+
+def begin_rerun():
+    _run_meter("app")
+
+def _metered_run(tag, ends_run):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def run(*a, **k):
+            fragment = _fragment_run()
+            meter = _run_meter(f"fragment:{tag}" if fragment else "app")
+            try:
+                with metered(tag):
+                    return fn(*a, **k)
+            finally:
+                if fragment and ends_run and st.session_state.get("op_meter") is meter:
+                    st.session_state.op_meter = None
+                    _rerun_meter.set(None)
+                    _finish_rerun(meter)
+        return run
+    return decorate
+
+def metered_fragment(tag):
+    # Decorates a fragment body (under @st.fragment): tags its operations
+    # and, on a fragment rerun, meters them (and its callbacks') as a run of
+    # their own, reported as the body returns.
+    return _metered_run(tag, ends_run=True)
+
+def metered_callback(tag):
+    # Decorates a widget callback, which runs before the fragment body.
+    return _metered_run(tag, ends_run=False)
+
+def _finish_rerun(meter):
+    totals = meter.totals()
+    st.session_state.last_op_meter = meter
+    nickname = st.session_state.get("nickname") or "-"
+    logger.info("rerun user=%s scope=%s reads=%d writes=%d kib=%.1f ms=%.1f",
+                nickname, meter.scope, totals["reads"], totals["writes"], totals["kib"], totals["ms"])
+    if READ_BUDGET and totals["reads"] > READ_BUDGET:
+        top = ", ".join(f"{r['tag']}.{r['op']}={r['docs']}" for r in meter.table()[:3])
+        logger.warning("rerun read budget exceeded user=%s scope=%s reads=%d budget=%d top=[%s]",
+                       nickname, meter.scope, totals["reads"], READ_BUDGET, top)
+
+def last_rerun_meter():
+    return st.session_state.get("last_op_meter")
+
+# ------------------------------ Instrumented Client
+# Wraps the Firestore client (and every ref, query, batch and transaction it
+# hands out) so each operation is recorded against the current tag.
+_CHAIN = {
+    "collection", "document", "where", "order_by", "limit", "limit_to_last", "offset",
+    "start_at", "start_after", "end_at", "end_before", "select", "count", "parent",
+}
+_WRITES = {"set", "update", "add", "create", "delete"}
+
+def _value_size(v):
+    # Firestore storage-size rules, roughly.
+    if v is None or isinstance(v, bool): return 1
+    if isinstance(v, (int, float, datetime)): return 8
+    if isinstance(v, str): return len(v.encode()) + 1
+    if isinstance(v, dict): return doc_size(v)
+    if isinstance(v, (list, tuple)): return sum(_value_size(x) for x in v)
+    return 16
+
+def doc_size(data):
+    if not data:
+        return 0
+    return sum(len(k.encode()) + 1 + _value_size(v) for k, v in data.items()) + 32
+
+def _snap_size(snap):
+    # Sized from the snapshot's own data: to_dict() would deep-copy every
+    # document just to measure it.
+    if not METER_BYTES or not getattr(snap, "exists", True):
+        return 0
+    data = getattr(snap, "_data", None)
+    return doc_size(data if data is not None else snap.to_dict())
+
+def _unwrap(value):
+    return value._target if isinstance(value, (_Metered, _MeteredBatch)) else value
+
+def _unwrap_kw(kwargs):
+    # transaction= arguments arrive wrapped like refs do.
+    return {k: _unwrap(v) for k, v in kwargs.items()}
+
+def _wrap(value):
+    if value is None or isinstance(value, (str, int, float, bool, list, dict, tuple)):
+        return value
+    return _Metered(value)
+
+class _Metered:
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name in _CHAIN:
+            if not callable(attr):
+                return _wrap(attr)
+            return lambda *a, **k: _wrap(attr(*map(_unwrap, a), **{x: _unwrap(y) for x, y in k.items()}))
+        if name == "stream":
+            return functools.partial(self._stream, attr)
+        if name == "get":
+            return functools.partial(self._get, attr)
+        if name == "get_all":
+            return lambda refs, *a, **k: self._stream(attr, [_unwrap(r) for r in refs], *a, **k)
+        if name in _WRITES:
+            return functools.partial(self._write, name, attr)
+        if name in ("batch", "transaction"):
+            return lambda *a, **k: _MeteredBatch(attr(*a, **k))
+        if name == "on_snapshot":
+            return functools.partial(self._on_snapshot, attr)
+        return attr
+
+    def __eq__(self, other):
+        return self._target == _unwrap(other)
+
+    def __hash__(self):
+        return hash(self._target)
+
+    def _stream(self, fn, *a, **k):
+        start, docs, nbytes = time.perf_counter(), 0, 0
+        try:
+            for snap in fn(*a, **_unwrap_kw(k)):
+                docs += 1
+                nbytes += _snap_size(snap)
+                yield snap
+        finally:
+            # A query is billed at least one read even when it matches nothing.
+            _record("stream", max(docs, 1), nbytes, (time.perf_counter() - start) * 1000)
+
+    def _get(self, fn, *a, **k):
+        start = time.perf_counter()
+        result = fn(*a, **_unwrap_kw(k))
+        ms = (time.perf_counter() - start) * 1000
+        if hasattr(result, "exists"):
+            _record("get", 1, _snap_size(result), ms)
+        elif result and isinstance(result[0], (list, tuple)):
+            _record("count", 1, 0, ms)
+        else:
+            _record("get", max(len(result), 1), sum(_snap_size(s) for s in result), ms)
+        return result
+
+    def _write(self, op, fn, *a, **k):
+        start = time.perf_counter()
+        result = fn(*map(_unwrap, a), **k)
+        nbytes = doc_size(a[0]) if METER_BYTES and a and isinstance(a[0], dict) else 0
+        _record(op, 1, nbytes, (time.perf_counter() - start) * 1000)
+        if op == "add":
+            update_time, ref = result
+            return update_time, _wrap(ref)
+        return result
+
+    def _on_snapshot(self, fn, callback):
+        tag = _tag.get()
+        def _metered_callback(docs, changes, read_time):
+            # Listener threads have no rerun meter; deltas count process-wide.
+            process_meter.record(tag, "listen", len(changes), sum(_snap_size(c.document) for c in changes), 0.0)
+            return callback(docs, changes, read_time)
+        return fn(_metered_callback)
+
+class _MeteredBatch:
+    def __init__(self, target):
+        self._target = target
+        self._ops = 0
+        self._bytes = 0
+
+    def _queue(self, fn, *a, **k):
+        self._ops += 1
+        self._bytes += doc_size(a[1]) if METER_BYTES and len(a) > 1 and isinstance(a[1], dict) else 0
+        return fn(*map(_unwrap, a), **k)
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name in ("set", "update", "delete", "create"):
+            return functools.partial(self._queue, attr)
+        return attr
+
+    def __len__(self):
+        return self._ops
+
+    def commit(self, *a, **k):
+        return self._commit_with(self._target.commit, *a, **k)
+
+    def _commit(self, *a, **k):
+        # How @firestore.transactional commits a transaction; each attempt
+        # queues its writes afresh.
+        try:
+            return self._commit_with(self._target._commit, *a, **k)
+        finally:
+            self._ops = self._bytes = 0
+
+    def _commit_with(self, fn, *a, **k):
+        start = time.perf_counter()
+        result = fn(*a, **k)
+        _record("commit", self._ops, self._bytes, (time.perf_counter() - start) * 1000)
+        return result
+
+def metered_client(client):
+    return _Metered(client)
@@ -0,0 +1,85 @@
+import time
+import streamlit as st
+from config import BULK_CHUNK_SIZE
+
+# ------------------------------ Write Bookkeeping
+def note_write():
+    # Lets the live listener (live.py) wait for the echo of this write on rerun,
+    # and moves this session past cached reads of the old data (analytics.py).
+    st.session_state.tasks_written = True
+    st.session_state.write_seq = st.session_state.get("write_seq", 0) + 1
+
+# ------------------------------ Mutation Queue
+# Per-session write-behind queue: doc_id -> [info, changes, queued_at], where
+# info is the task as it was when first queued and changes the merged update.
+# Views are updated as changes are queued (and by apply_queued on a full
+# rerun), so queued edits show up immediately;
+# flush_queue commits everything in one batch.
+def _queue():
+    return st.session_state.setdefault("mutation_queue", {})
+
+def queued_count():
+    return len(st.session_state.get("mutation_queue", {}))
+
+def queue_update(doc_id, info, changes):
+    queue = _queue()
+    entry = queue.setdefault(doc_id, [dict(info), {}, time.monotonic()])
+    entry[1].update(changes)
+    # Tasks are loaded without comments; the edit panel passes the stored one.
+    if "comment" in info:
+        entry[0].setdefault("comment", info["comment"])
+    # Drop fields that are back to their stored value; a completion toggled
+    # twice leaves nothing to write.
+    original = entry[0]
+    if "completed" in entry[1] and bool(entry[1]["completed"]) == bool(original.get("completed", False)):
+        entry[1].pop("completed")
+        entry[1].pop("completed_time", None)
+    if "comment" in entry[1] and entry[1]["comment"] == original.get("comment"):
+        entry[1].pop("comment")
+    if not entry[1]:
+        del queue[doc_id]
+
+def discard_queued(doc_id=None):
+    # Drops one task's queued changes (returning the task as stored) or all.
+    if doc_id is None:
+        st.session_state.pop("mutation_queue", None)
+        return None
+    entry = _queue().pop(doc_id, None)
+    return entry[0] if entry else None
+
+def queue_age():
+    queue = st.session_state.get("mutation_queue")
+    if not queue:
+        return 0.0
+    return time.monotonic() - min(e[2] for e in queue.values())
+
+def flush_queue(store, nickname):
+    # Returns the number of tasks written. On failure the queue is kept, so
+    # nothing the user sees is silently dropped. Changes to tasks deleted
+    # meanwhile (in another tab, say) cannot be written; they leave the queue
+    # and their task names are kept in session_state.queue_dropped.
+    queue = st.session_state.get("mutation_queue")
+    if not queue:
+        return 0
+    items, dropped = list(queue.items()), []
+    tasks = {doc_id: entry[0].get("task", "") for doc_id, entry in items}
+    for start in range(0, len(items), BULK_CHUNK_SIZE):
+        batch = store.batch(nickname)
+        for doc_id, (info, changes, _) in items[start:start + BULK_CHUNK_SIZE]:
+            batch.update(doc_id, changes)
+        batch.commit()
+        for doc_id, _ in items[start:start + BULK_CHUNK_SIZE]:
+            queue.pop(doc_id, None)
+        dropped += [tasks[doc_id] for doc_id in batch.missing]
+        note_write()
+    if dropped:
+        st.session_state.setdefault("queue_dropped", []).extend(dropped)
+    return len(items) - len(dropped)
+
+# ------------------------------ Optimistic View
+def apply_queued(tasks):
+    # Shows the queue on a freshly loaded view (TaskSnapshot or PagedTasks),
+    # as it will read once flushed.
+    for doc_id, (info, changes, _) in st.session_state.get("mutation_queue", {}).items():
+        tasks.apply_update(doc_id, info, changes)
+    return tasks
@@ -0,0 +1,120 @@
+import functools
+import streamlit as st
+from config import PAGE_SIZE
+from storage.base import merge_changes, task_delta, ROW_FIELDS
+
+# ------------------------------ Paged Task View
+# Group counts come from the stats document; rows are fetched one page at a
+# time, and only for groups whose expander is open. On Firestore this needs
+# the composite index items(completed, group, timestamp). Every paged row is
+# shown, so its comment is read along with it.
+_PAGE_FIELDS = ROW_FIELDS + ("comment",)
+
+class PagedTasks:
+    def __init__(self, store, nickname, stats, prefetched=None):
+        self.store = store
+        self.nickname = nickname
+        self._stats = stats
+        self._changed = {}    # doc_id -> local changes not yet in the store
+        self._deleted = set()
+        # (completed, group, cursor) -> a PAGE_SIZE page read ahead by the
+        # caller (page_reads), served once.
+        self._prefetched = dict(prefetched or {})
+
+    def groups_with(self, completed):
+        out = {}
+        for grp, v in self._stats["groups"].items():
+            n = v.get("completed", 0) if completed else v.get("total", 0) - v.get("completed", 0)
+            if n > 0:
+                out[grp] = n
+        return out
+
+    def count(self, completed=None, group=None):
+        v = self._stats if group is None else self._stats["groups"].get(group, {})
+        total, done = v.get("total", 0), v.get("completed", 0)
+        if completed is None:
+            return total
+        return done if completed else total - done
+
+    def page(self, completed, group, size, cursor=None):
+        fetched = self._prefetched.pop((completed, group, cursor), None) if size == PAGE_SIZE else None
+        if fetched is None:
+            fetched = self.store.page_tasks(self.nickname, completed, group, size, cursor, _PAGE_FIELDS)
+        rows, next_cursor = fetched
+        if self._changed or self._deleted:
+            # A toggled row leaves its stored tab's pages right away; it only
+            # shows on the other tab's pages once written.
+            rows = [(doc_id, merge_changes(info, self._changed.get(doc_id, {})))
+                    for doc_id, info in rows if doc_id not in self._deleted]
+            rows = [(doc_id, info) for doc_id, info in rows if bool(info.get("completed", False)) == completed]
+        return rows, next_cursor
+
+    def stats(self):
+        return self._stats
+
+    # Local edits, keeping the group counts in step.
+    def apply_update(self, doc_id, info, changes):
+        current = merge_changes(info, self._changed.get(doc_id, {}))
+        self._changed[doc_id] = {**self._changed.get(doc_id, {}), **changes}
+        self._count(*task_delta(current, changes))
+
+    def apply_delete(self, doc_id, info):
+        current = merge_changes(info, self._changed.pop(doc_id, {}))
+        self._deleted.add(doc_id)
+        self._count(*task_delta(current, sign=-1))
+
+    def _count(self, grp, delta):
+        v = self._stats["groups"].setdefault(grp, {"total": 0, "completed": 0})
+        for key, d in zip(("total", "completed"), delta):
+            v[key] += d
+            self._stats[key] += d
+
+# ------------------------------ Archived Task View
+# Archived tasks of one group, newest completion first, read only on demand.
+class ArchivedTasks:
+    def __init__(self, store, nickname):
+        self.store = store
+        self.nickname = nickname
+
+    def page(self, completed, group, size, cursor=None):
+        return self.store.page_archived(self.nickname, group, size, cursor)
+
+# ------------------------------ Pager Widgets
+# session_state[key] is the stack of cursors that led to the current page.
+def _pager_key(completed, group, name=None):
+    return f"pages_{name or ('completed' if completed else 'pending')}_{group}"
+
+def page_cursor(completed, group, name=None):
+    # Cursor of the page the pager will render next.
+    return st.session_state.get(_pager_key(completed, group, name), [None])[-1]
+
+def open_pages(groups):
+    # (completed, group, cursor) of the page each of the given groups renders.
+    return [(completed, grp, page_cursor(completed, grp)) for completed, grp in groups]
+
+def page_reads(store, nickname, wanted):
+    # One call per wanted page, for storage.executor.gather.
+    return [functools.partial(store.page_tasks, nickname, completed, grp, PAGE_SIZE, cursor, _PAGE_FIELDS)
+            for completed, grp, cursor in wanted]
+
+def page_rows(tasks, completed, group, name=None, fetched=None):
+    # fetched: the page at page_cursor(), when the caller already read it.
+    key = _pager_key(completed, group, name)
+    cursors = st.session_state.setdefault(key, [None])
+    rows, next_cursor = fetched or tasks.page(completed, group, PAGE_SIZE, cursors[-1])
+    if not rows and len(cursors) > 1:
+        # The last page was emptied by deletes or toggles.
+        cursors.pop()
+        rows, next_cursor = tasks.page(completed, group, PAGE_SIZE, cursors[-1])
+    return rows, next_cursor
+
+def render_pager(completed, group, next_cursor, name=None):
+    key = _pager_key(completed, group, name)
+    cursors = st.session_state[key]
+    if len(cursors) == 1 and next_cursor is None:
+        return
+    c1, c2, c3 = st.columns([0.12, 0.12, 0.76])
+    c1.button("◀ Previous", key=f"{key}_prev", disabled=len(cursors) == 1, on_click=cursors.pop)
+    c2.button("Next ▶", key=f"{key}_next", disabled=next_cursor is None,
+              on_click=cursors.append, args=(next_cursor,))
+    c3.caption(f"Page {len(cursors)}")
@@ -0,0 +1,139 @@
+import bisect, heapq, math, re
+import streamlit as st
+from storage.base import merge_changes
+
+# ------------------------------ Task Search Index
+# Inverted index over task names and descriptions: token -> {doc_id: weight},
+# a name token weighing twice a description token. The vocabulary is kept
+# sorted, so a query term also matches every token it is a prefix of.
+_TOKEN = re.compile(r"\w+")
+_FIELDS = ("task", "comment", "group", "completed", "timestamp")
+NAME_WEIGHT, COMMENT_WEIGHT = 2.0, 1.0
+PREFIX_FACTOR = 0.8     # a prefix match scores below an exact one
+MIN_PREFIX = 2          # shorter terms match whole tokens only
+MAX_EXPANSIONS = 200    # vocabulary tokens a single prefix may match
+MAX_RESULTS = 20
+
+def tokens(text):
+    return _TOKEN.findall(str(text or "").casefold())
+
+def _weights(info):
+    weights = {}
+    for token in tokens(info.get("task")):
+        weights[token] = weights.get(token, 0.0) + NAME_WEIGHT
+    for token in tokens(info.get("comment")):
+        weights[token] = weights.get(token, 0.0) + COMMENT_WEIGHT
+    return weights
+
+class SearchIndex:
+    def __init__(self, nickname, docs=()):
+        self.nickname = nickname
+        self.tasks = {}       # doc_id -> task
+        self.postings = {}    # token -> {doc_id: weight}
+        self.vocab = []       # sorted tokens
+        for doc_id, info in docs:
+            self._post(doc_id, info)
+        self.vocab = sorted(self.postings)
+
+    def _post(self, doc_id, info):
+        self.tasks[doc_id] = info
+        new = []
+        for token, weight in _weights(info).items():
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = {}
+                new.append(token)
+            posting[doc_id] = weight
+        return new
+
+    def add(self, doc_id, info):
+        self.remove(doc_id)
+        for token in self._post(doc_id, info):
+            bisect.insort(self.vocab, token)
+
+    def update(self, doc_id, changes):
+        info = self.tasks.get(doc_id)
+        if info is not None:
+            self.add(doc_id, merge_changes(info, changes))
+
+    def remove(self, doc_id):
+        info = self.tasks.pop(doc_id, None)
+        if info is None:
+            return
+        for token in _weights(info):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(doc_id, None)
+            if not posting:
+                del self.postings[token]
+                i = bisect.bisect_left(self.vocab, token)
+                if i < len(self.vocab) and self.vocab[i] == token:
+                    del self.vocab[i]
+
+    def _expand(self, term):
+        # Vocabulary tokens starting with term, the exact token first.
+        if len(term) < MIN_PREFIX:
+            return [term] if term in self.postings else []
+        i = bisect.bisect_left(self.vocab, term)
+        out = []
+        while i < len(self.vocab) and len(out) < MAX_EXPANSIONS and self.vocab[i].startswith(term):
+            out.append(self.vocab[i])
+            i += 1
+        return out
+
+    def search(self, query, limit=MAX_RESULTS):
+        # Every query term must match (as a token or a token prefix). Terms
+        # score weight x idf; rare tokens and name hits rank first.
+        terms = list(dict.fromkeys(tokens(query)))
+        if not terms:
+            return []
+        n = len(self.tasks)
+        scores = None
+        for term in terms:
+            term_scores = {}
+            for token in self._expand(term):
+                posting = self.postings[token]
+                factor = math.log(1 + n / len(posting)) * (1.0 if token == term else PREFIX_FACTOR)
+                for doc_id, weight in posting.items():
+                    score = weight * factor
+                    if score > term_scores.get(doc_id, 0.0):
+                        term_scores[doc_id] = score
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {d: s + term_scores[d] for d, s in scores.items() if d in term_scores}
+            if not scores:
+                return []
+        ranked = heapq.nsmallest(limit, scores.items(),
+                                 key=lambda kv: (-kv[1], str(self.tasks[kv[0]].get("task", "")).casefold()))
+        return [(doc_id, self.tasks[doc_id], score) for doc_id, score in ranked]
+
+# ------------------------------ Session Index
+# Built on the session's first search, then kept in step by this session's
+# own writes (tasks.py). Bulk deletes, imports, a discarded queue and the
+# sidebar Refresh drop it, so the next search rebuilds it.
+def get_index(store, nickname):
+    index = st.session_state.get("search_index")
+    if index is None or index.nickname != nickname:
+        index = SearchIndex(nickname, store.list_tasks(nickname, fields=_FIELDS))
+        st.session_state.search_index = index
+    return index
+
+def index_add(doc_id, info):
+    index = st.session_state.get("search_index")
+    if index is not None:
+        index.add(doc_id, info)
+
+def index_update(doc_id, changes):
+    index = st.session_state.get("search_index")
+    if index is not None:
+        index.update(doc_id, changes)
+
+def index_remove(doc_id):
+    index = st.session_state.get("search_index")
+    if index is not None:
+        index.remove(doc_id)
+
+def drop_index():
+    st.session_state.pop("search_index", None)
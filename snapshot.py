@@ -0,0 +1,90 @@
+from collections import defaultdict
+from storage.base import merge_changes, ROW_FIELDS
+
+def _timestamp_key(row):
+    ts = row[1].get("timestamp")
+    return (ts is None, ts)
+
+# ------------------------------ Task Snapshot
+# One in-memory copy of a user's tasks, fetched once per rerun and shared by
+# the sidebar, the add-task form and both renderers.
+class TaskSnapshot:
+    def __init__(self, docs=()):
+        self.tasks = {}
+        self._groups = {}
+        self._index = defaultdict(dict)
+        for doc_id, info in docs:
+            self.upsert(doc_id, info)
+
+    def upsert(self, doc_id, info):
+        if doc_id in self.tasks:
+            self.remove(doc_id)
+        grp = info.get("group", "General")
+        done = bool(info.get("completed", False))
+        self.tasks[doc_id] = info
+        self._groups[grp] = self._groups.get(grp, 0) + 1
+        self._index[(done, grp)][doc_id] = None
+
+    def remove(self, doc_id):
+        info = self.tasks.pop(doc_id, None)
+        if info is None:
+            return
+        grp = info.get("group", "General")
+        done = bool(info.get("completed", False))
+        self._index[(done, grp)].pop(doc_id, None)
+        self._groups[grp] -= 1
+        if not self._groups[grp]:
+            del self._groups[grp]
+
+    # Local edits, applied after the matching store write (or queued write).
+    def apply_update(self, doc_id, info, changes):
+        current = self.tasks.get(doc_id)
+        if current is not None:
+            self.upsert(doc_id, merge_changes(current, changes))
+
+    def apply_delete(self, doc_id, info):
+        self.remove(doc_id)
+
+    def groups(self):
+        return list(self._groups)
+
+    def rows(self, completed, group):
+        return [(doc_id, self.tasks[doc_id]) for doc_id in self._index.get((completed, group), ())]
+
+    def groups_with(self, completed):
+        out = {}
+        for grp in self._groups:
+            n = len(self._index.get((completed, grp), ()))
+            if n:
+                out[grp] = n
+        return out
+
+    def page(self, completed, group, size, cursor=None):
+        # Same contract as pages.PagedTasks.page; the cursor is a row offset.
+        rows = sorted(self.rows(completed, group), key=_timestamp_key)
+        start = cursor or 0
+        end = start + size
+        return rows[start:end], (end if end < len(rows) else None)
+
+    def count(self, completed=None, group=None):
+        groups = [group] if group is not None else self._groups
+        states = [completed] if completed is not None else (False, True)
+        return sum(len(self._index.get((s, g), ())) for s in states for g in groups)
+
+    def copy(self):
+        return TaskSnapshot(self.tasks.items())
+
+    def stats(self):
+        # Same shape as the stats document in stats.py.
+        groups = {
+            grp: {"total": total, "completed": self.count(True, grp)}
+            for grp, total in self._groups.items()
+        }
+        return {
+            "total": len(self.tasks),
+            "completed": sum(v["completed"] for v in groups.values()),
+            "groups": groups,
+        }
+
+def load_snapshot(store, nickname):
+    return TaskSnapshot(store.list_tasks(nickname, fields=ROW_FIELDS))
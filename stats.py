@@ -0,0 +1,99 @@
+import argparse
+from bisect import bisect_left
+
+# ------------------------------ Stats Shape
+# Every backend reports stats as {"total", "completed",
+# "groups": {group: {"total", "completed"}}}. The Firestore backend keeps them
+# in a denormalized tasks/{nickname}/meta/stats document updated by every task
+# write; the SQLite backend computes them from its indexes.
+def empty_stats():
+    return {"total": 0, "completed": 0, "groups": {}}
+
+def stats_from_rows(rows):
+    stats = empty_stats()
+    for _, info in rows:
+        grp  = info.get("group", "General")
+        done = int(bool(info.get("completed", False)))
+        stats["total"] += 1
+        stats["completed"] += done
+        stats["groups"].setdefault(grp, {"total": 0, "completed": 0})
+        stats["groups"][grp]["total"]     += 1
+        stats["groups"][grp]["completed"] += done
+    return stats
+
+def add_delta(stats, grp, delta):
+    # Counts a task_delta (storage/base.py) into stats.
+    group = stats["groups"].setdefault(grp, {"total": 0, "completed": 0})
+    for key, d in zip(("total", "completed"), delta):
+        stats[key] += d
+        group[key] += d
+
+def visible_groups(stats):
+    stats["groups"] = {g: v for g, v in stats["groups"].items() if v.get("total", 0) > 0}
+    return stats
+
+def with_archive(stats, archive):
+    # Folds archived counts ({group: {"count", "seconds"}}, see archive.py)
+    # into live stats for totals that cover a user's whole history.
+    if not archive:
+        return stats
+    out = {"total": stats["total"], "completed": stats["completed"],
+           "groups": {g: dict(v) for g, v in stats["groups"].items()}}
+    for grp, v in archive.items():
+        n = v.get("count", 0)
+        if not n:
+            continue
+        out["total"] += n
+        out["completed"] += n
+        g = out["groups"].setdefault(grp, {"total": 0, "completed": 0})
+        g["total"] += n
+        g["completed"] += n
+    return out
+
+# ------------------------------ Group Registry
+# Sorted view of the groups in a stats document (kept current by every task
+# batch), so group pickers need no task reads. Lookups are case-insensitive.
+class GroupIndex:
+    def __init__(self, stats):
+        self.groups = stats["groups"]
+        self._keys = sorted((g.casefold(), g) for g in self.groups)
+        self._folded = [k for k, _ in self._keys]
+
+    def names(self, include=()):
+        names = [g for _, g in self._keys]
+        extra = [g for g in include if self.canonical(g) is None]
+        return sorted(names + extra, key=str.casefold) if extra else names
+
+    def prefix(self, text, limit=None):
+        # Groups starting with text, in sorted order.
+        key = text.casefold()
+        out = []
+        for folded, grp in self._keys[bisect_left(self._folded, key):]:
+            if not folded.startswith(key) or (limit and len(out) >= limit):
+                break
+            out.append(grp)
+        return out
+
+    def canonical(self, name):
+        # The existing spelling of name, if a group matches it.
+        key = name.casefold()
+        i = bisect_left(self._folded, key)
+        if i < len(self._folded) and self._folded[i] == key:
+            return self._keys[i][1]
+        return None
+
+    def counts(self, group):
+        return self.groups.get(group, {"total": 0, "completed": 0})
+
+# ------------------------------ Repair Command
+# python stats.py <nickname> [<nickname> ...]
+if __name__ == "__main__":
+    from storage import get_store
+
+    parser = argparse.ArgumentParser(description="Rebuild per-user task stats from a full scan.")
+    parser.add_argument("nicknames", nargs="+")
+    args = parser.parse_args()
+    store = get_store()
+    for nick in args.nicknames:
+        rebuilt = store.rebuild_stats(nick)
+        print(f"{nick}: total={rebuilt['total']} completed={rebuilt['completed']} groups={len(rebuilt['groups'])}")
@@ -0,0 +1,57 @@
+import logging, threading
+from config import STORAGE_BACKEND, SQLITE_PATH, TASK_CACHE_TTL_SECONDS
+from storage.base import TaskStore, TaskBatch, DELETE_FIELD
+
+logger = logging.getLogger(__name__)
+_store = None
+_lock = threading.Lock()
+_warming = None
+
+# ------------------------------ Backend Selection
+def get_store() -> TaskStore:
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                if STORAGE_BACKEND == "sqlite":
+                    from storage.sqlite import SqliteStore
+                    store = SqliteStore(SQLITE_PATH)
+                elif STORAGE_BACKEND == "firestore":
+                    from storage.firestore import FirestoreStore
+                    store = FirestoreStore()
+                else:
+                    raise ValueError(f"Unknown storage backend: {STORAGE_BACKEND}")
+                _store = _with_cache(store)
+    return _store
+
+def warm_up_store():
+    # Creates the store on a background thread: the backend's imports, client
+    # and connection (firebase_utils.py) are set up while the login form is
+    # filled in, and the page that asked for it does not wait.
+    global _warming
+    with _lock:
+        if _store is not None or _warming is not None:
+            return
+        _warming = threading.Thread(target=_warm_up, name="store-warmup", daemon=True)
+    _warming.start()
+
+def _warm_up():
+    try:
+        get_store()
+    except Exception:
+        # get_store() raises it again where a page needs the store.
+        logger.warning("store warm-up failed", exc_info=True)
+
+def _with_cache(store):
+    if TASK_CACHE_TTL_SECONDS > 0:
+        from storage.cache import CachedStore
+        return CachedStore(store)
+    return store
+
+def set_store(store):
+    # Lets headless drivers (bench/, scripts) run the app against a given store,
+    # behind the task cache like the configured one.
+    global _store
+    with _lock:
+        _store = _with_cache(store)
+    return _store
@@ -0,0 +1,246 @@
+import secrets, string
+from datetime import datetime
+from config import ARCHIVE_CHUNK_SIZE
+from utils import to_datetime
+
+# ------------------------------ Storage Interface
+# Backends store users and per-user tasks. A task is a plain dict with the
+# fields add_new_task writes: task, group, comment, completed, timestamp,
+# created_str and (once completed) completed_time.
+
+class _DeleteField:
+    def __repr__(self):
+        return "DELETE_FIELD"
+
+# Use as a value in update() changes to remove the field.
+DELETE_FIELD = _DeleteField()
+
+# Field projections for reads that need less than the whole task. Stats need
+# only group and status; task rows add name and times but not the comment,
+# which is fetched for the rows on screen (get_comments).
+STAT_FIELDS = ("group", "completed")
+ROW_FIELDS  = ("task", "group", "completed", "timestamp", "completed_time")
+
+_ID_CHARS = string.ascii_letters + string.digits
+
+def new_task_id():
+    return "".join(secrets.choice(_ID_CHARS) for _ in range(20))
+
+def merge_changes(info, changes):
+    # The task as it reads after update(changes), of the same type as info.
+    out = dict(info)
+    for key, value in changes.items():
+        if value is DELETE_FIELD: out.pop(key, None)
+        else: out[key] = value
+    return Task(out) if isinstance(info, Task) else out
+
+def task_delta(info, changes=None, sign=1):
+    # (group, (total_delta, completed_delta)) for adding (sign=1), deleting
+    # (sign=-1) or updating (changes given) one task.
+    grp  = info.get("group", "General")
+    done = bool(info.get("completed", False))
+    if changes is None:
+        return grp, (sign, sign * int(done))
+    if "completed" in changes and bool(changes["completed"]) != done:
+        return grp, (0, 1 if changes["completed"] else -1)
+    return grp, (0, 0)
+
+def _naive(ts):
+    if ts.tzinfo is None:
+        return ts
+    offset = ts.utcoffset()
+    ts = ts.replace(tzinfo=None)
+    return ts - offset if offset else ts
+
+# ------------------------------ Task Record
+# Stores hand tasks out as Task records rather than document dicts: one slot
+# per field (an absent field is an unset slot), completed as a bool and
+# timestamps as naive UTC datetimes, converted once at load. Task reads like
+# a dict (get, [], in, keys), so code written for task dicts takes either.
+_TASK_FIELDS = ("task", "group", "comment", "completed", "timestamp", "completed_time", "created_str")
+_TASK_KEYS = frozenset(_TASK_FIELDS)
+_TIME_KEYS = frozenset(("timestamp", "completed_time"))
+
+class Task:
+    __slots__ = _TASK_FIELDS
+
+    def __init__(self, data):
+        for key, value in data.items():
+            if key in _TIME_KEYS:
+                if value is not None:
+                    value = to_datetime(value)
+                    if value is not None:
+                        value = _naive(value)
+            elif key == "completed":
+                value = bool(value)
+            elif key not in _TASK_KEYS:
+                continue
+            setattr(self, key, value)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in _TASK_KEYS else default
+
+    def __getitem__(self, key):
+        if key in _TASK_KEYS and hasattr(self, key):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in _TASK_KEYS and hasattr(self, key)
+
+    def keys(self):
+        return [key for key in _TASK_FIELDS if hasattr(self, key)]
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in _TASK_FIELDS if hasattr(self, key)]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __repr__(self):
+        return f"Task({dict(self.items())!r})"
+
+def task_duration(info):
+    # Seconds from creation to completion, or None.
+    ts, ct = info.get("timestamp"), info.get("completed_time")
+    if not (isinstance(ts, datetime) and isinstance(ct, datetime)):
+        return None
+    return max((_naive(ct) - _naive(ts)).total_seconds(), 0.0)
+
+def archive_month(info):
+    return _naive(info["completed_time"]).strftime("%Y-%m")
+
+def add_summary(summaries, info):
+    # Counts an archived task into {(group, month): [archived, duration seconds]}.
+    summary = summaries.setdefault((info.get("group", "General"), archive_month(info)), [0, 0.0])
+    summary[0] += 1
+    summary[1] += task_duration(info) or 0.0
+
+class TaskBatch:
+    # Collects task writes for one user; backends commit them atomically,
+    # together with the stats and archive summaries they imply, worked out
+    # from the tasks as stored at commit time rather than the caller's copies.
+    # Updates and deletes of tasks that no longer exist are skipped and their
+    # ids left in missing.
+    def __init__(self, store, nickname):
+        self.store = store
+        self.nickname = nickname
+        self.ops = []
+        self.missing = []
+
+    def add(self, doc):
+        doc_id = new_task_id()
+        self.ops.append(("set", doc_id, doc))
+        return doc_id
+
+    def update(self, doc_id, changes):
+        self.ops.append(("update", doc_id, changes))
+
+    def delete(self, doc_id):
+        self.ops.append(("delete", doc_id, None))
+
+    def archive(self, doc_id, info):
+        # Moves a completed task (info: the whole task) to the archive,
+        # leaving it counted in the per-group monthly summaries instead of
+        # the live stats.
+        self.ops.append(("archive", doc_id, info))
+
+    def __len__(self):
+        return len(self.ops)
+
+    def commit(self):
+        raise NotImplementedError
+
+class TaskStore:
+    can_watch = False
+
+    # Users
+    def get_user(self, nickname):
+        raise NotImplementedError
+
+    def create_user(self, nickname, data) -> bool:
+        raise NotImplementedError
+
+    def set_password_hash(self, nickname, password_hash):
+        raise NotImplementedError
+
+    # Invalidates every session token issued to the user so far (auth.py);
+    # get_user()["session_epoch"] counts the calls.
+    def revoke_sessions(self, nickname):
+        raise NotImplementedError
+
+    # Tasks
+    # fields=None reads whole tasks; otherwise only the named fields.
+    def list_tasks(self, nickname, completed=None, group=None, fields=None):
+        raise NotImplementedError
+
+    def page_tasks(self, nickname, completed, group, size, cursor=None, fields=None):
+        # Returns (rows, next_cursor); rows ordered by timestamp, so fields
+        # must include timestamp.
+        raise NotImplementedError
+
+    def get_comments(self, nickname, doc_ids) -> dict:
+        # {doc_id: comment} for the tasks that still exist.
+        raise NotImplementedError
+
+    def batch(self, nickname) -> TaskBatch:
+        raise NotImplementedError
+
+    def delete_tasks_where(self, nickname, completed=None, group=None, progress=None) -> int:
+        # progress(deleted_so_far) is called as chunks commit.
+        batch = self.batch(nickname)
+        for doc_id, info in self.list_tasks(nickname, completed, group, fields=STAT_FIELDS):
+            batch.delete(doc_id)
+        if len(batch):
+            batch.commit()
+        if progress:
+            progress(len(batch))
+        return len(batch)
+
+    # Archive
+    def archive_tasks(self, nickname, before, progress=None) -> int:
+        # Archives tasks completed before `before` (naive UTC datetime).
+        batch, done = self.batch(nickname), 0
+        for doc_id, info in self.list_tasks(nickname, completed=True):
+            ct = info.get("completed_time")
+            if isinstance(ct, datetime) and _naive(ct) < before:
+                batch.archive(doc_id, info)
+            if len(batch) >= ARCHIVE_CHUNK_SIZE:
+                batch.commit()
+                done += len(batch)
+                batch = self.batch(nickname)
+                if progress: progress(done)
+        if len(batch):
+            batch.commit()
+            done += len(batch)
+        if progress: progress(done)
+        return done
+
+    def load_archive(self, nickname):
+        # {group: {"count", "seconds"}} over everything archived.
+        raise NotImplementedError
+
+    def archive_summaries(self, nickname, group):
+        # [{"group", "month", "count", "seconds"}, ...], newest month first.
+        raise NotImplementedError
+
+    def page_archived(self, nickname, group, size, cursor=None):
+        # Same contract as page_tasks, newest completion first.
+        raise NotImplementedError
+
+    def list_archived(self, nickname, fields=None):
+        raise NotImplementedError
+
+    def watch_tasks(self, nickname, on_change):
+        # on_change([(kind, doc_id, info), ...]) with kind ADDED/MODIFIED/REMOVED.
+        raise NotImplementedError
+
+    # Counts
+    def load_stats(self, nickname):
+        raise NotImplementedError
+
+    def rebuild_stats(self, nickname):
+        raise NotImplementedError
@@ -0,0 +1,28 @@
+import time
+from config import BULK_RETRIES
+
+# ------------------------------ Chunked Bulk Mutations
+# Runs a bulk job one chunk at a time: step() finds, writes and counts the
+# next chunk in one transaction and returns how many documents it handled, so
+# memory stays bounded no matter how many documents match. Chunks run in
+# sequence, as each one rewrites the user's stats document: in parallel they
+# would keep aborting each other. A failed chunk is retried with exponential
+# backoff; having written nothing, it finds the same documents again.
+# progress(done) is called from the caller's thread, so it may touch
+# Streamlit elements.
+def run_chunks(step, size, progress=None, retries=BULK_RETRIES):
+    done = 0
+    while True:
+        for attempt in range(retries + 1):
+            try:
+                n = step()
+                break
+            except Exception:
+                if attempt == retries:
+                    raise
+                time.sleep(0.2 * 2 ** attempt)
+        done += n
+        if progress and n:
+            progress(done)
+        if n < size:
+            return done
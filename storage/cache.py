@@ -0,0 +1,291 @@
+import copy, logging, pickle, threading, time
+from collections import OrderedDict
+from config import TASK_CACHE_TTL_SECONDS, TASK_CACHE_MAX_ROWS, SHARED_CACHE_URL
+from stats import add_delta, visible_groups
+from storage.base import ROW_FIELDS, Task, merge_changes, task_delta
+from storage.shared_cache import open_shared_cache
+
+# ------------------------------ Task Cache
+# Process-wide cache of per-user reads, shared by every session (tabs and
+# devices of the same user hit one entry): the task rows a snapshot is built
+# from (snapshot.py), stats counts and archive counts. Entries expire after
+# TASK_CACHE_TTL_SECONDS and are evicted least-recently-used first once the
+# cached rows pass TASK_CACHE_MAX_ROWS.
+#
+# Every write goes through the store (batches, bulk deletes, archiving), so
+# CachedStore keeps the user's entries current as it commits: a task batch is
+# applied to the cached rows and stats (patch), while bulk jobs, which work on
+# whatever their query matches, drop them. A per-user generation, moved by
+# every write, keeps a read that raced a write from caching what it read
+# before it.
+#
+# With TODO_SHARED_CACHE_URL set, the generations live in the shared tier
+# (storage/shared_cache.py), so a write in one worker process retires every
+# worker's entries, and values loaded by one worker are served to the others.
+logger = logging.getLogger(__name__)
+
+_cache = OrderedDict()   # key -> [value, rows, expires_at, generation]
+_gens = {}               # nickname -> writes seen (no shared tier)
+_lock = threading.Lock()
+_rows = 0
+_metrics = {"hits": 0, "shared_hits": 0, "misses": 0, "expired": 0, "stale": 0,
+            "evictions": 0, "invalidations": 0, "patches": 0, "errors": 0}
+_shared = open_shared_cache(SHARED_CACHE_URL) if SHARED_CACHE_URL else None
+
+def _drop(key):
+    global _rows
+    _rows -= _cache.pop(key)[1]
+
+def _generation(nickname):
+    if _shared is None:
+        with _lock:
+            return _gens.get(nickname, 0)
+    return _shared.generation(nickname)
+
+def _shared_key(key, gen):
+    # nickname last, as it may contain the separator.
+    return f"{gen}:{':'.join(map(str, key[1:]))}:{key[0]}"
+
+def _failed(action):
+    with _lock:
+        _metrics["errors"] += 1
+    logger.warning("shared task cache: %s failed", action, exc_info=True)
+
+def _advance(nickname):
+    # Moves the user's generation on; the new one, or None if it is unknown.
+    with _lock:
+        _gens[nickname] = _gens.get(nickname, 0) + 1
+        gen = _gens[nickname]
+    if _shared is None:
+        return gen
+    try:
+        return _shared.bump(nickname)
+    except Exception:
+        _failed("invalidation")
+        return None
+
+def invalidate(nickname):
+    _advance(nickname)
+    with _lock:
+        for key in [k for k in _cache if k[0] == nickname]:
+            _drop(key)
+        _metrics["invalidations"] += 1
+
+def _apply(rows, stats, ops):
+    # (rows, stats) after a batch's ops, or None when a task it updates or
+    # deletes is not among rows. The inputs are left as they were: sessions
+    # may still be reading them.
+    out, stats = list(rows), copy.deepcopy(stats)
+    index = {doc_id: i for i, (doc_id, _) in enumerate(out)}
+    def count(info, changes=None, sign=1):
+        if stats is not None:
+            add_delta(stats, *task_delta(info, changes, sign))
+    for op, doc_id, data in ops:
+        i = index.get(doc_id)
+        if op == "set":
+            info = Task({k: v for k, v in data.items() if k in ROW_FIELDS})
+            if i is None:
+                index[doc_id] = len(out)
+                out.append((doc_id, info))
+            else:
+                count(out[i][1], sign=-1)
+                out[i] = (doc_id, info)
+            count(info)
+        elif i is None:
+            return None
+        elif op == "update":
+            count(out[i][1], data)
+            out[i] = (doc_id, merge_changes(out[i][1], {k: v for k, v in data.items() if k in ROW_FIELDS}))
+        else:
+            count(out[i][1], sign=-1)
+            out[i] = None
+            del index[doc_id]
+    return [r for r in out if r is not None], visible_groups(stats) if stats is not None else None
+
+def patch(nickname, ops, gen):
+    # Applies a committed batch to the user's cached rows and stats, which
+    # stay cached under the generation the write moves to. gen is the
+    # generation read before the commit: if another write moved it since,
+    # the entries may be missing that write and are dropped instead, as they
+    # are when the rows lack a task the batch touched. Archive totals only
+    # change when the batch archives tasks; then they are dropped.
+    global _rows
+    with _lock:
+        rows_e, stats_e = _cache.get((nickname, "rows")), _cache.get((nickname, "stats"))
+        archive_e = _cache.get((nickname, "archive"))
+    patched = {}
+    if archive_e is not None and archive_e[3] == gen and all(op != "archive" for op, _, _ in ops):
+        patched[(nickname, "archive")] = (archive_e, archive_e[0], archive_e[1])
+    if rows_e is not None and rows_e[3] == gen:
+        stats_e = stats_e if stats_e is not None and stats_e[3] == gen else None
+        result = _apply(rows_e[0], stats_e[0] if stats_e else None, ops)
+        if result is not None:
+            patched[(nickname, "rows")] = (rows_e, result[0], len(result[0]))
+            if stats_e:
+                patched[(nickname, "stats")] = (stats_e, result[1], 1)
+    new_gen = _advance(nickname)
+    kept = {}
+    with _lock:
+        for key in [k for k in _cache if k[0] == nickname]:
+            entry, p = _cache[key], patched.get(key)
+            if new_gen is not None and new_gen == gen + 1 and p is not None and entry is p[0]:
+                _rows += p[2] - entry[1]
+                _cache[key] = [p[1], p[2], entry[2], new_gen]
+                kept[key] = (p[1], entry[2] - time.monotonic())
+            else:
+                _drop(key)
+        _metrics["patches" if kept else "invalidations"] += 1
+        while _rows > TASK_CACHE_MAX_ROWS:
+            _drop(next(iter(_cache)))
+            _metrics["evictions"] += 1
+    if _shared is not None:
+        # Other workers pick the patched values up instead of re-reading.
+        for key, (value, ttl) in kept.items():
+            try:
+                data = pickle.dumps((time.time() + ttl, value), pickle.HIGHEST_PROTOCOL)
+                _shared.set(_shared_key(key, new_gen), data, ttl)
+            except Exception:
+                _failed("write")
+
+def _keep(key, value, rows, gen, ttl):
+    global _rows
+    with _lock:
+        if key in _cache:
+            _drop(key)
+        _cache[key] = [value, rows, time.monotonic() + ttl, gen]
+        _rows += rows
+        while _rows > TASK_CACHE_MAX_ROWS:
+            _drop(next(iter(_cache)))
+            _metrics["evictions"] += 1
+
+def _cached(key, load, size=lambda value: 1):
+    try:
+        gen = _generation(key[0])
+    except Exception:
+        # Without the generation there is no telling a cached entry is current.
+        _failed("generation read")
+        return load()
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            if entry[3] == gen and entry[2] > time.monotonic():
+                _cache.move_to_end(key)
+                _metrics["hits"] += 1
+                return entry[0]
+            _drop(key)
+            _metrics["expired" if entry[3] == gen else "stale"] += 1
+    if _shared is not None:
+        try:
+            data = _shared.get(_shared_key(key, gen))
+        except Exception:
+            _failed("read")
+            data = None
+        if data is not None:
+            expires, value = pickle.loads(data)
+            rows = size(value)
+            if rows <= TASK_CACHE_MAX_ROWS:
+                _keep(key, value, rows, gen, expires - time.time())
+            with _lock:
+                _metrics["shared_hits"] += 1
+            return value
+    with _lock:
+        _metrics["misses"] += 1
+    value = load()
+    rows = size(value)
+    if rows > TASK_CACHE_MAX_ROWS:
+        return value
+    try:
+        current = _generation(key[0]) == gen
+    except Exception:
+        _failed("generation read")
+        current = False
+    if not current:
+        return value
+    _keep(key, value, rows, gen, TASK_CACHE_TTL_SECONDS)
+    if _shared is not None:
+        try:
+            data = pickle.dumps((time.time() + TASK_CACHE_TTL_SECONDS, value), pickle.HIGHEST_PROTOCOL)
+            _shared.set(_shared_key(key, gen), data, TASK_CACHE_TTL_SECONDS)
+        except Exception:
+            _failed("write")
+    return value
+
+def cache_stats():
+    with _lock:
+        lookups = _metrics["hits"] + _metrics["shared_hits"] + _metrics["misses"]
+        return {**_metrics, "entries": len(_cache), "rows": _rows, "shared": _shared is not None,
+                "hit_rate": (_metrics["hits"] + _metrics["shared_hits"]) / lookups if lookups else 0.0}
+
+# ------------------------------ Cached Store
+# Wraps a backend: cached reads, invalidating writes, everything else passed
+# through. Cached listings are shared lists of Task records, so callers only
+# read them; stats dicts are copied out, as views update them in place. Other
+# listings (search, analytics, exports) stream through uncached.
+class CachedStore:
+    def __init__(self, store):
+        self.store = store
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    def list_tasks(self, nickname, completed=None, group=None, fields=None):
+        if completed is not None or group is not None or fields != ROW_FIELDS:
+            return self.store.list_tasks(nickname, completed, group, fields)
+        return _cached((nickname, "rows"), lambda: list(self.store.list_tasks(nickname, fields=ROW_FIELDS)), len)
+
+    def load_stats(self, nickname):
+        return copy.deepcopy(_cached((nickname, "stats"), lambda: self.store.load_stats(nickname)))
+
+    def load_archive(self, nickname):
+        return copy.deepcopy(_cached((nickname, "archive"), lambda: self.store.load_archive(nickname)))
+
+    def batch(self, nickname):
+        return _InvalidatingBatch(self.store.batch(nickname))
+
+    def delete_tasks_where(self, nickname, completed=None, group=None, progress=None):
+        try:
+            return self.store.delete_tasks_where(nickname, completed, group, progress=progress)
+        finally:
+            invalidate(nickname)
+
+    def archive_tasks(self, nickname, before, progress=None):
+        try:
+            return self.store.archive_tasks(nickname, before, progress=progress)
+        finally:
+            invalidate(nickname)
+
+    def rebuild_stats(self, nickname):
+        try:
+            return self.store.rebuild_stats(nickname)
+        finally:
+            invalidate(nickname)
+
+class _InvalidatingBatch:
+    def __init__(self, batch):
+        self.batch = batch
+
+    def __getattr__(self, name):
+        return getattr(self.batch, name)
+
+    def __len__(self):
+        return len(self.batch)
+
+    def commit(self):
+        nickname = self.batch.nickname
+        try:
+            gen = _generation(nickname)
+        except Exception:
+            _failed("generation read")
+            gen = None
+        try:
+            result = self.batch.commit()
+        except Exception:
+            # Dropped: the commit may have partly applied.
+            invalidate(nickname)
+            raise
+        if gen is None or self.batch.missing:
+            # Tasks deleted elsewhere that the cache may still hold.
+            invalidate(nickname)
+        else:
+            patch(nickname, self.batch.ops, gen)
+        return result
@@ -0,0 +1,18 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from config import QUERY_WORKERS
+
+# ------------------------------ Concurrent Reads
+# Runs the independent reads of one render side by side on a process-wide
+# bounded pool, so the render waits about one round trip rather than one per
+# read. Each call runs in a copy of the caller's context, which carries the
+# metering tag and the per-rerun meter (metering.py). Calls must not gather
+# themselves: a full pool would wait on its own workers.
+_pool = ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix="query") if QUERY_WORKERS > 1 else None
+
+def gather(*calls):
+    # Results in call order; a failed call raises here, in the caller.
+    if _pool is None or len(calls) < 2:
+        return [call() for call in calls]
+    futures = [_pool.submit(contextvars.copy_context().run, call) for call in calls]
+    return [f.result() for f in futures]
@@ -0,0 +1,254 @@
+from firebase_admin import firestore
+from google.api_core.exceptions import Conflict
+from firebase_utils import initialize_firebase
+import hashlib
+from config import METER_FIRESTORE, BULK_CHUNK_SIZE, ARCHIVE_CHUNK_SIZE
+from metering import metered_client
+from stats import empty_stats, stats_from_rows, visible_groups, add_delta
+from storage.base import TaskStore, TaskBatch, Task, DELETE_FIELD, STAT_FIELDS, add_summary, merge_changes, task_delta
+from storage.bulk import run_chunks
+
+# ------------------------------ Firestore Backend
+# users/{nickname}                  account document
+# tasks/{nickname}/items/{id}       one document per task
+# tasks/{nickname}/meta/stats       denormalized counters (see stats.py)
+# tasks/{nickname}/archive/{id}     archived completed tasks
+# tasks/{nickname}/summaries/{id}   archived count/duration per group and month
+# tasks/{nickname}/meta/archive     the same, summed per group
+
+def _to_firestore(changes):
+    return {k: (firestore.DELETE_FIELD if v is DELETE_FIELD else v) for k, v in changes.items()}
+
+def _summary_id(group, month):
+    # Group names may contain "/", which document ids cannot.
+    return f"{month}_{hashlib.sha1(group.encode()).hexdigest()[:16]}"
+
+def _stats_in(txn, store, nickname):
+    # (stats, existed) as of txn; an absent stats document is counted from
+    # the tasks in the same transaction, so no write can slip in between.
+    snap = store.stats_ref(nickname).get(transaction=txn)
+    if snap.exists:
+        stats = empty_stats()
+        stats.update(snap.to_dict())
+        return stats, True
+    rows = ((d.id, d.to_dict()) for d in store._query(nickname, fields=STAT_FIELDS).stream(transaction=txn))
+    return stats_from_rows(rows), False
+
+@firestore.transactional
+def _commit_ops(txn, batch):
+    # Reads the tasks the batch touches and the stats document, then writes
+    # the tasks and the stats as they now add up. Another session's write to
+    # any of them makes Firestore retry the whole function.
+    store, nickname = batch.store, batch.nickname
+    items = store.items(nickname)
+    ids = list(dict.fromkeys(doc_id for op, doc_id, _ in batch.ops if op != "set"))
+    stored = {}
+    if ids:
+        snaps = store.db.get_all([items.document(i) for i in ids], field_paths=list(STAT_FIELDS), transaction=txn)
+        stored = {s.id: s.to_dict() or {} for s in snaps if s.exists}
+    stats, existed = _stats_in(txn, store, nickname)
+    changed, missing, summaries = not existed, [], {}
+    for op, doc_id, data in batch.ops:
+        ref = items.document(doc_id)
+        if op == "set":
+            txn.set(ref, data)
+            stored[doc_id] = data
+            grp, delta = task_delta(data)
+        elif doc_id not in stored:
+            missing.append(doc_id)
+            continue
+        elif op == "update":
+            txn.update(ref, _to_firestore(data))
+            grp, delta = task_delta(stored[doc_id], data)
+            stored[doc_id] = merge_changes(stored[doc_id], data)
+        else:
+            if op == "archive":
+                txn.set(store.archive(nickname).document(doc_id), data)
+                add_summary(summaries, data)
+            txn.delete(ref)
+            grp, delta = task_delta(stored.pop(doc_id), sign=-1)
+        if delta != (0, 0):
+            add_delta(stats, grp, delta)
+            changed = True
+    if changed:
+        txn.set(store.stats_ref(nickname), visible_groups(stats))
+    _add_summaries(txn, store, nickname, summaries)
+    return missing
+
+@firestore.transactional
+def _bulk_chunk(txn, store, nickname, query, archive):
+    # The next page of matching tasks, removed (or archived) and counted out
+    # of the stats in one transaction: each task is read once, here, and what
+    # is counted is what gets deleted.
+    docs = list(query.stream(transaction=txn))
+    if not docs:
+        return 0
+    stats, _ = _stats_in(txn, store, nickname)
+    items, summaries = store.items(nickname), {}
+    for d in docs:
+        info = d.to_dict()
+        if archive:
+            txn.set(store.archive(nickname).document(d.id), info)
+            add_summary(summaries, info)
+        txn.delete(items.document(d.id))
+        add_delta(stats, *task_delta(info, sign=-1))
+    txn.set(store.stats_ref(nickname), visible_groups(stats))
+    _add_summaries(txn, store, nickname, summaries)
+    return len(docs)
+
+def _add_summaries(txn, store, nickname, summaries):
+    if not summaries:
+        return
+    inc = firestore.Increment
+    totals = {}
+    for (grp, month), (n, seconds) in summaries.items():
+        txn.set(store.summaries(nickname).document(_summary_id(grp, month)),
+                {"group": grp, "month": month, "count": inc(n), "seconds": inc(seconds)}, merge=True)
+        t = totals.setdefault(grp, [0, 0.0])
+        t[0] += n; t[1] += seconds
+    txn.set(store.archive_ref(nickname),
+            {"groups": {g: {"count": inc(n), "seconds": inc(sec)} for g, (n, sec) in totals.items()}},
+            merge=True)
+
+class FirestoreBatch(TaskBatch):
+    def commit(self):
+        self.missing = _commit_ops(self.store.db.transaction(), self)
+
+class FirestoreStore(TaskStore):
+    can_watch = True
+
+    def __init__(self, db=None):
+        db = db or initialize_firebase()
+        self.db = metered_client(db) if METER_FIRESTORE else db
+
+    def items(self, nickname):
+        return self.db.collection("tasks").document(nickname).collection("items")
+
+    def stats_ref(self, nickname):
+        return self.db.collection("tasks").document(nickname).collection("meta").document("stats")
+
+    def archive(self, nickname):
+        return self.db.collection("tasks").document(nickname).collection("archive")
+
+    def summaries(self, nickname):
+        return self.db.collection("tasks").document(nickname).collection("summaries")
+
+    def archive_ref(self, nickname):
+        return self.db.collection("tasks").document(nickname).collection("meta").document("archive")
+
+    def _query(self, nickname, completed=None, group=None, fields=None):
+        query = self.items(nickname)
+        if completed is not None: query = query.where("completed", "==", completed)
+        if group is not None: query = query.where("group", "==", group)
+        if fields is not None: query = query.select(list(fields))
+        return query
+
+    # Users
+    def get_user(self, nickname):
+        snap = self.db.collection("users").document(nickname).get()
+        return snap.to_dict() if snap.exists else None
+
+    def create_user(self, nickname, data) -> bool:
+        # One atomic write: create() fails the whole batch if the user exists.
+        batch = self.db.batch()
+        batch.create(self.db.collection("users").document(nickname), data)
+        batch.set(self.db.collection("tasks").document(nickname), {"init": True})
+        try:
+            batch.commit()
+        except Conflict:
+            return False
+        return True
+
+    def set_password_hash(self, nickname, password_hash):
+        self.db.collection("users").document(nickname).update({"password_hash": password_hash})
+
+    def revoke_sessions(self, nickname):
+        self.db.collection("users").document(nickname).update({"session_epoch": firestore.Increment(1)})
+
+    # Tasks
+    def list_tasks(self, nickname, completed=None, group=None, fields=None):
+        return ((d.id, Task(d.to_dict())) for d in self._query(nickname, completed, group, fields).stream())
+
+    def page_tasks(self, nickname, completed, group, size, cursor=None, fields=None):
+        # Document id breaks timestamp ties so no row is skipped between pages.
+        query = self._query(nickname, completed, group, fields).order_by("timestamp").order_by("__name__").limit(size + 1)
+        if cursor is not None:
+            query = query.start_after({"timestamp": cursor[0], "__name__": cursor[1]})
+        docs = list(query.stream())
+        rows = [(d.id, Task(d.to_dict())) for d in docs[:size]]
+        next_cursor = (rows[-1][1].get("timestamp"), rows[-1][0]) if len(docs) > size else None
+        return rows, next_cursor
+
+    def get_comments(self, nickname, doc_ids) -> dict:
+        items = self.items(nickname)
+        snaps = self.db.get_all([items.document(i) for i in doc_ids], field_paths=["comment"])
+        return {s.id: (s.to_dict() or {}).get("comment", "") for s in snaps if s.exists}
+
+    def batch(self, nickname):
+        return FirestoreBatch(self, nickname)
+
+    def _bulk(self, nickname, query, size, archive, progress):
+        # Every chunk removes what it matched, so the first page is always next.
+        query = query.limit(size)
+        return run_chunks(lambda: _bulk_chunk(self.db.transaction(), self, nickname, query, archive),
+                          size, progress)
+
+    def delete_tasks_where(self, nickname, completed=None, group=None, progress=None) -> int:
+        query = self._query(nickname, completed, group, STAT_FIELDS)
+        return self._bulk(nickname, query, BULK_CHUNK_SIZE, False, progress)
+
+    # Archive
+    # Needs the composite index items(completed, completed_time).
+    def archive_tasks(self, nickname, before, progress=None) -> int:
+        # A range filter must be the first ordering.
+        query = self._query(nickname, completed=True).where("completed_time", "<", before).order_by("completed_time")
+        return self._bulk(nickname, query, ARCHIVE_CHUNK_SIZE, True, progress)
+
+    def load_archive(self, nickname):
+        snap = self.archive_ref(nickname).get()
+        return (snap.to_dict() or {}).get("groups", {}) if snap.exists else {}
+
+    def archive_summaries(self, nickname, group):
+        rows = [d.to_dict() for d in self.summaries(nickname).where("group", "==", group).stream()]
+        return sorted(rows, key=lambda r: r["month"], reverse=True)
+
+    def list_archived(self, nickname, fields=None):
+        query = self.archive(nickname)
+        if fields is not None: query = query.select(list(fields))
+        return ((d.id, Task(d.to_dict())) for d in query.stream())
+
+    # Needs the composite index archive(group, completed_time desc).
+    def page_archived(self, nickname, group, size, cursor=None):
+        query = (self.archive(nickname).where("group", "==", group)
+                 .order_by("completed_time", direction="DESCENDING")
+                 .order_by("__name__", direction="DESCENDING").limit(size + 1))
+        if cursor is not None:
+            query = query.start_after({"completed_time": cursor[0], "__name__": cursor[1]})
+        docs = list(query.stream())
+        rows = [(d.id, Task(d.to_dict())) for d in docs[:size]]
+        next_cursor = (rows[-1][1].get("completed_time"), rows[-1][0]) if len(docs) > size else None
+        return rows, next_cursor
+
+    def watch_tasks(self, nickname, on_change):
+        def _on_snapshot(docs, changes, read_time):
+            on_change([(c.type.name, c.document.id, Task(c.document.to_dict() or {})) for c in changes])
+        return self.items(nickname).on_snapshot(_on_snapshot)
+
+    # Counts
+    def load_stats(self, nickname):
+        snap = self.stats_ref(nickname).get()
+        if not snap.exists:
+            return visible_groups(self.rebuild_stats(nickname))
+        stats = empty_stats()
+        stats.update(snap.to_dict())
+        return visible_groups(stats)
+
+    def rebuild_stats(self, nickname):
+        return _rebuild_stats(self.db.transaction(), self, nickname)
+
+@firestore.transactional
+def _rebuild_stats(txn, store, nickname):
+    rows = ((d.id, d.to_dict()) for d in store._query(nickname, fields=STAT_FIELDS).stream(transaction=txn))
+    stats = visible_groups(stats_from_rows(rows))
+    txn.set(store.stats_ref(nickname), stats)
+    return stats
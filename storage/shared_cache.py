@@ -0,0 +1,81 @@
+import sqlite3, threading, time
+
+# ------------------------------ Shared Cache Tier
+# Key-value store shared by every worker process (storage/cache.py): cached
+# values under string keys with a TTL, and one generation counter per user
+# that writers bump. A worker checks the counter before serving from its own
+# memory, so a write in any worker retires every worker's copy. bump()
+# returns the new generation.
+#
+# TODO_SHARED_CACHE_URL picks the backend:
+#   redis://host:6379/0        Redis or a compatible server (pip install redis)
+#   sqlite:///path/cache.db    a SQLite file on a disk all workers share
+# Values are pickled; the tier must be private to the deployment.
+def open_shared_cache(url):
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCache(url)
+    if url.startswith("sqlite:///"):
+        return SqliteCache(url[len("sqlite:///"):])
+    raise ValueError(f"Unknown shared cache URL: {url}")
+
+class RedisCache:
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url, socket_timeout=1.0)
+
+    def generation(self, nickname):
+        return int(self.client.get(f"todo:gen:{nickname}") or 0)
+
+    def bump(self, nickname):
+        return int(self.client.incr(f"todo:gen:{nickname}"))
+
+    def get(self, key):
+        return self.client.get(f"todo:val:{key}")
+
+    def set(self, key, data, ttl):
+        self.client.set(f"todo:val:{key}", data, px=max(int(ttl * 1000), 1))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    nickname  TEXT PRIMARY KEY,
+    gen       INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    key      TEXT PRIMARY KEY,
+    value    BLOB NOT NULL,
+    expires  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_by_expiry ON entries (expires);
+"""
+
+class SqliteCache:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(_SCHEMA)
+
+    def generation(self, nickname):
+        with self.lock:
+            row = self.conn.execute("SELECT gen FROM generations WHERE nickname = ?", (nickname,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, nickname):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT INTO generations (nickname, gen) VALUES (?, 1) "
+                              "ON CONFLICT (nickname) DO UPDATE SET gen = gen + 1", (nickname,))
+            return self.conn.execute("SELECT gen FROM generations WHERE nickname = ?", (nickname,)).fetchone()[0]
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM entries WHERE key = ? AND expires > ?",
+                                    (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, data, ttl):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM entries WHERE expires <= ?", (now,))
+            self.conn.execute("INSERT OR REPLACE INTO entries (key, value, expires) VALUES (?, ?, ?)",
+                              (key, data, now + ttl))
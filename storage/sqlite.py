@@ -0,0 +1,247 @@
+import sqlite3, threading
+from datetime import datetime
+from stats import empty_stats, visible_groups
+from storage.base import TaskStore, TaskBatch, Task, DELETE_FIELD, add_summary
+
+# ------------------------------ SQLite Backend
+# Single-file local store for self-hosted deployments and load testing.
+# tasks_by_status covers the renderers' (user, completed, group) filters and
+# the timestamp ordering used for paging, as well as the grouped counts.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    nickname       TEXT PRIMARY KEY,
+    password_hash  TEXT NOT NULL,
+    created_at     TEXT,
+    session_epoch  INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id              TEXT PRIMARY KEY,
+    user            TEXT NOT NULL,
+    task            TEXT,
+    grp             TEXT NOT NULL DEFAULT 'General',
+    comment         TEXT,
+    completed       INTEGER NOT NULL DEFAULT 0,
+    timestamp       TEXT,
+    completed_time  TEXT,
+    created_str     TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_by_status ON tasks (user, completed, grp, timestamp);
+CREATE TABLE IF NOT EXISTS archived_tasks (
+    id              TEXT PRIMARY KEY,
+    user            TEXT NOT NULL,
+    task            TEXT,
+    grp             TEXT NOT NULL DEFAULT 'General',
+    comment         TEXT,
+    completed       INTEGER NOT NULL DEFAULT 1,
+    timestamp       TEXT,
+    completed_time  TEXT,
+    created_str     TEXT
+);
+CREATE INDEX IF NOT EXISTS archived_by_group ON archived_tasks (user, grp, completed_time);
+CREATE TABLE IF NOT EXISTS archive_summaries (
+    user     TEXT NOT NULL,
+    grp      TEXT NOT NULL,
+    month    TEXT NOT NULL,
+    count    INTEGER NOT NULL DEFAULT 0,
+    seconds  REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (user, grp, month)
+);
+"""
+
+# task field -> column
+_COLUMNS = {
+    "task": "task", "group": "grp", "comment": "comment", "completed": "completed",
+    "timestamp": "timestamp", "completed_time": "completed_time", "created_str": "created_str",
+}
+_FIELDS = "id, task, grp, comment, completed, timestamp, completed_time, created_str"
+
+def _select(fields=None, table="tasks"):
+    return f"SELECT id, {', '.join(_COLUMNS[f] for f in fields or _COLUMNS)} FROM {table}"
+
+def _to_sql(field, value):
+    if value is DELETE_FIELD or value is None:
+        return None
+    if field == "completed":
+        return int(bool(value))
+    if isinstance(value, datetime):
+        return value.isoformat(timespec="microseconds")
+    return value
+
+def _from_row(row, fields=None):
+    # Columns are converted here, so Task gets datetimes and a bool as is.
+    info = {}
+    for field, value in zip(fields or _COLUMNS, row[1:]):
+        if field == "completed":
+            value = bool(value)
+        elif field in ("timestamp", "completed_time"):
+            value = datetime.fromisoformat(value) if value else None
+            if value is None and field == "completed_time":
+                continue
+        info[field] = value
+    return row[0], Task(info)
+
+def _where(nickname, completed=None, group=None):
+    sql, args = " WHERE user = ?", [nickname]
+    if completed is not None:
+        sql += " AND completed = ?"; args.append(int(completed))
+    if group is not None:
+        sql += " AND grp = ?"; args.append(group)
+    return sql, args
+
+class SqliteBatch(TaskBatch):
+    # Stats are counted by query, so only archive summaries follow the rows.
+    def commit(self):
+        conn, user, summaries = self.store.conn, self.nickname, {}
+        self.missing = []
+        with self.store.lock, conn:
+            for op, doc_id, data in self.ops:
+                if op == "set":
+                    cols = [c for c in _COLUMNS if c in data]
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO tasks (id, user, {', '.join(_COLUMNS[c] for c in cols)}) "
+                        f"VALUES (?, ?, {', '.join('?' for _ in cols)})",
+                        [doc_id, user] + [_to_sql(c, data[c]) for c in cols],
+                    )
+                    continue
+                if op == "update":
+                    cols = [c for c in _COLUMNS if c in data]
+                    sets = ", ".join(_COLUMNS[c] + " = ?" for c in cols) or "id = id"
+                    cur = conn.execute(f"UPDATE tasks SET {sets} WHERE id = ? AND user = ?",
+                                       [_to_sql(c, data[c]) for c in cols] + [doc_id, user])
+                elif op == "archive":
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO archived_tasks ({_FIELDS}, user) "
+                        f"SELECT {_FIELDS}, user FROM tasks WHERE id = ? AND user = ?", (doc_id, user))
+                    cur = conn.execute("DELETE FROM tasks WHERE id = ? AND user = ?", (doc_id, user))
+                    if cur.rowcount:
+                        add_summary(summaries, data)
+                else:
+                    cur = conn.execute("DELETE FROM tasks WHERE id = ? AND user = ?", (doc_id, user))
+                if not cur.rowcount:
+                    self.missing.append(doc_id)
+            for (grp, month), (n, seconds) in summaries.items():
+                conn.execute(
+                    "INSERT INTO archive_summaries (user, grp, month, count, seconds) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (user, grp, month) DO UPDATE SET count = count + excluded.count, "
+                    "seconds = seconds + excluded.seconds",
+                    (user, grp, month, n, seconds))
+
+class SqliteStore(TaskStore):
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.RLock()
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(_SCHEMA)
+            if "session_epoch" not in {r[1] for r in self.conn.execute("PRAGMA table_info(users)")}:
+                self.conn.execute("ALTER TABLE users ADD COLUMN session_epoch INTEGER NOT NULL DEFAULT 0")
+
+    def _fetch(self, sql, args=()):
+        with self.lock:
+            return self.conn.execute(sql, args).fetchall()
+
+    # Users
+    def get_user(self, nickname):
+        rows = self._fetch("SELECT password_hash, created_at, session_epoch FROM users WHERE nickname = ?", (nickname,))
+        if not rows:
+            return None
+        pwd_hash, created, epoch = rows[0]
+        return {"password_hash": pwd_hash, "created_at": datetime.fromisoformat(created) if created else None,
+                "session_epoch": epoch}
+
+    def create_user(self, nickname, data) -> bool:
+        with self.lock, self.conn:
+            cur = self.conn.execute(
+                "INSERT OR IGNORE INTO users (nickname, password_hash, created_at) VALUES (?, ?, ?)",
+                (nickname, data["password_hash"], _to_sql("created_at", data.get("created_at"))),
+            )
+            return cur.rowcount == 1
+
+    def set_password_hash(self, nickname, password_hash):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE users SET password_hash = ? WHERE nickname = ?", (password_hash, nickname))
+
+    def revoke_sessions(self, nickname):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE users SET session_epoch = session_epoch + 1 WHERE nickname = ?", (nickname,))
+
+    # Tasks
+    def list_tasks(self, nickname, completed=None, group=None, fields=None):
+        sql, args = _where(nickname, completed, group)
+        return [_from_row(r, fields) for r in self._fetch(_select(fields) + sql, args)]
+
+    def page_tasks(self, nickname, completed, group, size, cursor=None, fields=None):
+        sql, args = _where(nickname, completed, group)
+        if cursor is not None:
+            sql += " AND (timestamp, id) > (?, ?)"; args += list(cursor)
+        rows = [_from_row(r, fields)
+                for r in self._fetch(_select(fields) + sql + " ORDER BY timestamp, id LIMIT ?", args + [size + 1])]
+        page = rows[:size]
+        next_cursor = None
+        if len(rows) > size:
+            doc_id, info = page[-1]
+            next_cursor = (_to_sql("timestamp", info.get("timestamp")), doc_id)
+        return page, next_cursor
+
+    def get_comments(self, nickname, doc_ids) -> dict:
+        doc_ids = list(doc_ids)
+        if not doc_ids:
+            return {}
+        return {doc_id: comment or "" for doc_id, comment in self._fetch(
+            f"SELECT id, comment FROM tasks WHERE user = ? AND id IN ({', '.join('?' for _ in doc_ids)})",
+            [nickname] + doc_ids)}
+
+    def batch(self, nickname):
+        return SqliteBatch(self, nickname)
+
+    def delete_tasks_where(self, nickname, completed=None, group=None, progress=None) -> int:
+        sql, args = _where(nickname, completed, group)
+        with self.lock, self.conn:
+            deleted = self.conn.execute("DELETE FROM tasks" + sql, args).rowcount
+        if progress:
+            progress(deleted)
+        return deleted
+
+    # Archive
+    def load_archive(self, nickname):
+        return {grp: {"count": n, "seconds": sec} for grp, n, sec in self._fetch(
+            "SELECT grp, SUM(count), SUM(seconds) FROM archive_summaries WHERE user = ? GROUP BY grp", (nickname,))}
+
+    def archive_summaries(self, nickname, group):
+        return [{"group": group, "month": month, "count": n, "seconds": sec} for month, n, sec in self._fetch(
+            "SELECT month, count, seconds FROM archive_summaries WHERE user = ? AND grp = ? ORDER BY month DESC",
+            (nickname, group))]
+
+    def list_archived(self, nickname, fields=None):
+        return [_from_row(r, fields) for r in self._fetch(_select(fields, "archived_tasks") + " WHERE user = ?", (nickname,))]
+
+    def page_archived(self, nickname, group, size, cursor=None):
+        sql, args = " WHERE user = ? AND grp = ?", [nickname, group]
+        if cursor is not None:
+            sql += " AND (completed_time, id) < (?, ?)"; args += list(cursor)
+        rows = [_from_row(r) for r in self._fetch(
+            _select(table="archived_tasks") + sql + " ORDER BY completed_time DESC, id DESC LIMIT ?",
+            args + [size + 1])]
+        page = rows[:size]
+        next_cursor = None
+        if len(rows) > size:
+            doc_id, info = page[-1]
+            next_cursor = (_to_sql("completed_time", info.get("completed_time")), doc_id)
+        return page, next_cursor
+
+    def watch_tasks(self, nickname, on_change):
+        return None
+
+    # Counts
+    def load_stats(self, nickname):
+        stats = empty_stats()
+        for grp, total, done in self._fetch(
+            "SELECT grp, COUNT(*), SUM(completed) FROM tasks WHERE user = ? GROUP BY grp", (nickname,)
+        ):
+            stats["groups"][grp] = {"total": total, "completed": done or 0}
+            stats["total"] += total
+            stats["completed"] += done or 0
+        return visible_groups(stats)
+
+    def rebuild_stats(self, nickname):
+        return self.load_stats(nickname)
@@ -1,11 +1,19 @@
+import io
 from datetime import datetime
 import streamlit as st
-from firebase_admin import firestore
-from utils import format_task_timestamp, fmt_elapsed_since, safe_dt_str
-from firebase_utils import initialize_firebase
+from utils import format_task_timestamp, fmt_elapsed_since, fmt_seconds, safe_dt_str
+from storage import DELETE_FIELD
+from storage.base import task_duration
+from pages import ArchivedTasks, page_cursor, page_rows, render_pager
+from storage.executor import gather
+from transfer import FORMATS, export_file, import_tasks
+from metering import metered_fragment, metered_callback
+from mutations import note_write, queue_update, queued_count, queue_age, flush_queue, discard_queued
+from search import get_index, index_add, index_update, index_remove, drop_index
+from config import WRITE_BEHIND, WRITE_DELAY_SECONDS, QUEUE_REFRESH_SECONDS, PAGE_SIZE
 
 # ------------------------------ Add New Task
-def add_new_task(name, group, comment, tasks_ref):
+def add_new_task(name, group, comment, store, nickname):
     created_time = datetime.utcnow()
     doc = {
         "task": name,
@@ -15,194 +23,436 @@ def add_new_task(name, group, comment, tasks_ref):
         "timestamp": created_time,
         "created_str": format_task_timestamp(created_time)
     }
-    tasks_ref.add(doc)
+    batch = store.batch(nickname)
+    doc_id = batch.add(doc)
+    batch.commit()
+    note_write()
+    index_add(doc_id, doc)
+
+# ------------------------------ Search
+@st.fragment
+@metered_fragment("search")
+def render_search(store, nickname):
+    query = st.text_input("🔍 Search tasks", key="task_search",
+                          placeholder="Words, or the start of words, from a task name or description")
+    if not query.strip():
+        return
+    results = get_index(store, nickname).search(query)
+    if not results:
+        st.info(f"No tasks match '{query}'.")
+        return
+    st.dataframe([
+        {"Task": info.get("task", ""), "Group": info.get("group", "General"),
+         "Status": "✅ Completed" if info.get("completed") else "⌛ Pending",
+         "Description": info.get("comment", ""), "Added": safe_dt_str(info.get("timestamp"))}
+        for _, info, _ in results
+    ], hide_index=True, width="stretch")
+
+# ------------------------------ Import / Export
+def render_transfer(store, nickname):
+    with st.expander("📦 Import / Export Tasks"):
+        fmt = st.radio("File format", FORMATS, horizontal=True, key="transfer_fmt", format_func=str.upper)
+        # Passing a callable defers the export until the button is clicked.
+        st.download_button("⬇️ Export Tasks", data=lambda: export_file(store, nickname, fmt),
+                           file_name=f"{nickname}_tasks.{fmt}",
+                           mime="text/csv" if fmt == "csv" else "application/x-ndjson",
+                           key="export_btn")
+
+        report = st.session_state.pop("import_report", None)
+        if report:
+            imported, skipped, errors = report
+            st.success(f"✅ Imported {imported} tasks.")
+            if skipped:
+                st.warning(f"⚠️ Skipped {skipped} rows:\n\n" +
+                           "\n".join(f"- line {line}: {msg}" for line, msg in errors))
+
+        upload = st.file_uploader("Import tasks from a file", type=list(FORMATS), key="import_file")
+        if upload is not None and st.button("⬆️ Import Tasks", key="import_btn"):
+            upload_fmt = "jsonl" if upload.name.lower().endswith(".jsonl") else "csv"
+            bar = st.progress(0.0, text="Importing tasks…")
+            def progress(done):
+                bar.progress(min(upload.tell() / max(upload.size, 1), 1.0), text=f"Imported {done} tasks…")
+            try:
+                text = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+                report = import_tasks(store, nickname, text, upload_fmt, progress=progress)
+            except (ValueError, UnicodeDecodeError) as e:
+                st.error(f"❌ Could not read {upload.name}: {e}")
+                return
+            finally:
+                bar.empty()
+            if report[0]:
+                note_write()
+                drop_index()
+            st.session_state.import_report = report
+            st.rerun()
+
+# ------------------------------ Update Tasks
+# With WRITE_BEHIND, updates go to the session's mutation queue (mutations.py)
+# and are committed together by Apply or after WRITE_DELAY_SECONDS.
+def _write_update(doc_id, info, changes, store, nickname):
+    if WRITE_BEHIND:
+        if not queued_count():
+            # The bar only shows (and saves) a queue that a full rerun saw.
+            st.session_state.queue_started = True
+        queue_update(doc_id, info, changes)
+        return changes
+    batch = store.batch(nickname)
+    batch.update(doc_id, changes)
+    batch.commit()
+    note_write()
+    if batch.missing:
+        # Deleted in another session meanwhile; None tells the caller.
+        _notify(f"⚠️ '{info.get('task', '')}' was deleted elsewhere; change not saved.")
+        return None
+    return changes
+
+def set_task_completed(doc_id, info, completed, store, nickname, extra=None):
+    changes = dict(extra or {})
+    changes["completed"] = completed
+    changes["completed_time"] = datetime.utcnow() if completed else DELETE_FIELD
+    return _write_update(doc_id, info, changes, store, nickname)
+
+def update_task_comment(doc_id, info, comment, store, nickname):
+    return _write_update(doc_id, info, {"comment": comment}, store, nickname)
+
+# Widget callbacks run before the rerun they trigger and patch the task view
+# the group fragment renders from, so the change shows without a reload.
+# Callbacks of a fragment may not draw, so toasts wait for the fragment body.
+def _notify(message):
+    st.session_state.task_notice = message
+
+def _show_notice():
+    if st.session_state.pop("queue_started", False):
+        st.rerun(scope="app")
+    message = st.session_state.pop("task_notice", None)
+    if message:
+        st.toast(message)
+
+@metered_callback("toggle")
+def _on_toggle(doc_id, info, key, store, nickname, tasks):
+    completed = st.session_state[key]
+    changes = set_task_completed(doc_id, info, completed, store, nickname)
+    if changes is None:
+        _gone(doc_id, info, tasks)
+        return
+    tasks.apply_update(doc_id, info, changes)
+    index_update(doc_id, changes)
+    if not completed:
+        _notify("↩️ Moved back to Pending.")
+
+@metered_callback("save")
+def _on_save(doc_id, info, store, nickname, tasks):
+    new_comment = st.session_state.get(f"comm_{doc_id}", info.get("comment", ""))
+    if st.session_state.get(f"complete_{doc_id}", False):
+        changes = set_task_completed(doc_id, info, True, store, nickname, extra={"comment": new_comment})
+    else:
+        changes = update_task_comment(doc_id, info, new_comment, store, nickname)
+    st.session_state[f"edit_{doc_id}"] = False
+    if changes is None:
+        _gone(doc_id, info, tasks)
+        return
+    tasks.apply_update(doc_id, info, changes)
+    index_update(doc_id, changes)
+    _notify("✅ Updated.")
+
+def _gone(doc_id, info, tasks):
+    tasks.apply_delete(doc_id, info)
+    index_remove(doc_id)
+
+@metered_callback("delete")
+def _on_delete(doc_id, info, store, nickname, tasks):
+    delete_task(doc_id, info, store, nickname)
+    tasks.apply_delete(doc_id, info)
+
+# ------------------------------ Task Comments
+# Task views are loaded without comments (storage.base.ROW_FIELDS); the rows
+# on screen read theirs in one projected fetch, kept for the session's
+# fragment reruns and dropped on each full rerun (main.py).
+def load_comments(store, nickname, rows):
+    cache = st.session_state.setdefault("task_comments", {})
+    missing = [doc_id for doc_id, info in rows if "comment" not in info and doc_id not in cache]
+    if missing:
+        cache.update(store.get_comments(nickname, missing))
+    return {doc_id: info["comment"] if "comment" in info else cache.get(doc_id, "") for doc_id, info in rows}
+
+def prefetch_comments(store, nickname, tasks, groups):
+    # One read for the comments of every open group's page, instead of one
+    # per group fragment.
+    rows = [row for completed, grp in groups
+            for row in tasks.page(completed, grp, PAGE_SIZE, page_cursor(completed, grp))[0]]
+    load_comments(store, nickname, rows)
+
+# ------------------------------ Apply Queued Changes
+def apply_changes(store, nickname):
+    try:
+        written = flush_queue(store, nickname)
+    except Exception as e:
+        st.error(f"❌ Could not save {queued_count()} queued changes: {e}")
+        return 0
+    dropped = st.session_state.pop("queue_dropped", None)
+    if dropped:
+        _notify(f"⚠️ Not saved, deleted elsewhere: {', '.join(repr(t) for t in dropped[:5])}"
+                + (f" and {len(dropped) - 5} more." if len(dropped) > 5 else "."))
+    return written
+
+def flush_due(store, nickname):
+    # Commits the queue once its oldest change is WRITE_DELAY_SECONDS old.
+    if WRITE_DELAY_SECONDS and queued_count() and queue_age() >= WRITE_DELAY_SECONDS:
+        return apply_changes(store, nickname)
+    return 0
+
+def render_queue_bar(store, nickname):
+    # Drawn, and ticking, only while changes are queued: the first change
+    # queued by a group fragment reruns the app to bring it up, and emptying
+    # the queue reruns the app to take it down.
+    st.session_state.pop("queue_started", None)
+    if queued_count():
+        _queue_bar(store, nickname)
+
+@st.fragment(run_every=QUEUE_REFRESH_SECONDS or None)
+@metered_fragment("queue_bar")
+def _queue_bar(store, nickname):
+    # Group fragments queue changes without rerunning this bar, so it
+    # refreshes itself, and writes the queue out once it is due.
+    n = queued_count()
+    flush_due(store, nickname)
+    if queued_count() < n:
+        st.rerun(scope="app")
+    n = queued_count()
+    if not n:
+        return
+    c1, c2, c3 = st.columns([0.7, 0.15, 0.15])
+    c1.info(f"📝 {n} unsaved change{'s' if n > 1 else ''}"
+            + (f" — saving automatically in {WRITE_DELAY_SECONDS:g}s." if WRITE_DELAY_SECONDS else "."))
+    if c2.button("✅ Apply", key="queue_apply"):
+        saved = apply_changes(store, nickname)
+        if saved:
+            st.toast(f"✅ Saved {saved} change{'s' if saved > 1 else ''}.")
+        if not queued_count():
+            st.rerun(scope="app")
+    if c3.button("↩️ Discard", key="queue_discard"):
+        discard_queued()
+        drop_index()
+        st.rerun(scope="app")
 
 # ------------------------------ Delete Tasks
-def delete_all_completed(tasks_ref, unique_id, db):
+def _bulk_delete(store, nickname, expected, **where):
+    # Queued toggles land first, so what is deleted matches what was shown.
+    apply_changes(store, nickname)
+    bar = st.progress(0.0, text="Deleting tasks…")
+    def progress(done):
+        frac = min(done / expected, 1.0) if expected else 1.0
+        bar.progress(frac, text=f"Deleted {done} of {max(done, expected)} tasks…")
+    try:
+        return store.delete_tasks_where(nickname, progress=progress, **where)
+    except Exception as e:
+        # Chunks already committed stay deleted; refresh views so they show it.
+        note_write()
+        st.error(f"Bulk delete stopped part-way: {e}")
+    finally:
+        bar.empty()
+        drop_index()
+
+def delete_all_completed(store, nickname, unique_id, expected=0):
     btn_key = f"del_all_completed_{unique_id}"
     if st.button("❌ Delete All Pending Tasks in All Groups", key=btn_key):
-        docs = list(tasks_ref.where("completed", "==", False).stream())
-        if not docs:
+        deleted = _bulk_delete(store, nickname, expected, completed=False)
+        if deleted is None:
+            return
+        if not deleted:
             st.info("No pending tasks to delete.")
             return
-        batch = db.batch()
-        for d in docs:
-            batch.delete(d.reference)
-        batch.commit()
+        note_write()
         st.toast("❌ Deleted all pending tasks.")
         st.rerun()
 
-def delete_group_completed(group_name, tasks_ref, unique_id, db):
+def delete_group_completed(group_name, store, nickname, unique_id, expected=0):
     btn_key = f"del_group_completed_{group_name}_{unique_id}"
     if st.button(f"❌ Delete All Pending Tasks in : {group_name}", key=btn_key):
-        docs = list(
-            tasks_ref.where("group", "==", group_name)
-                     .where("completed", "==", False)
-                     .stream()
-        )
-        if not docs:
+        deleted = _bulk_delete(store, nickname, expected, completed=False, group=group_name)
+        if deleted is None:
+            return
+        if not deleted:
             st.info(f"No Pending tasks to delete in '{group_name}'.")
             return
-        batch = db.batch()
-        for d in docs:
-            batch.delete(d.reference)
-        batch.commit()
+        note_write()
         st.toast(f"❌ Deleted all Pending tasks in '{group_name}'.")
         st.rerun()
 
-def delete_task(doc_id, task_text, tasks_ref):
-    tasks_ref.document(doc_id).delete()
-    st.toast(f"❌ Deleted '{task_text}'.")
-    st.rerun()
-
-def get_pending_count_from_firestore(grp) -> int:
-    db = initialize_firebase()
-    nickname = st.session_state.nickname
-    tasks_ref = db.collection("tasks").document(nickname).collection("items")
-    query = tasks_ref.where("completed", "==", False).where("group", "==", grp)
-    return len(list(query.stream()))
-
-def get_completed_count_from_firestore(grp) -> int:
-    db = initialize_firebase()
-    nickname = st.session_state.nickname
-    tasks_ref = db.collection("tasks").document(nickname).collection("items")
-    query = tasks_ref.where("completed", "==", True).where("group", "==", grp)
-    return len(list(query.stream()))
-
-def get_allpending_count_from_firestore() -> int:
-    db = initialize_firebase()
-    nickname = st.session_state.nickname
-    tasks_ref = db.collection("tasks").document(nickname).collection("items")
-    query = tasks_ref.where("completed", "==", False)
-    return len(list(query.stream()))
+def delete_task(doc_id, info, store, nickname):
+    # Its queued changes go with it.
+    discard_queued(doc_id)
+    batch = store.batch(nickname)
+    batch.delete(doc_id)
+    batch.commit()
+    note_write()
+    index_remove(doc_id)
+    _notify(f"❌ Deleted '{info.get('task', '')}'.")
+
+# ------------------------------ Group Expanders
+def _expander_key(completed, grp):
+    return f"exp_{'completed' if completed else 'pending'}_{grp}"
+
+def open_groups():
+    # (completed, group) of every expanded group.
+    out = []
+    for key, value in st.session_state.items():
+        if value is True and isinstance(key, str):
+            if key.startswith("exp_pending_"): out.append((False, key[len("exp_pending_"):]))
+            elif key.startswith("exp_completed_"): out.append((True, key[len("exp_completed_"):]))
+    return out
 
 # ------------------------------ Pending Tasks Renderer
-def render_pending(tasks_ref, db):
-    docs = list(tasks_ref.where("completed", "==", False).stream())
-    if not docs:
+# Each group expander is its own fragment: a row edit, a page turn or opening
+# the group reruns only that group, rendering from the task view captured by
+# the last full run (patched in place by the row callbacks).
+def render_pending(store, nickname, tasks):
+    groups = tasks.groups_with(completed=False)
+    if not groups:
         st.info("🎉 No Active tasks.")
         return
 
-    grouped = {}
-    for d in docs:
-        grouped.setdefault(d.to_dict().get("group","General"), []).append((d.id, d.to_dict()))
-
-    for grp, rows in grouped.items():
-        completedtaskcount = get_completed_count_from_firestore(grp)
-        expander_label = f" ▶ {grp}"
-        grptitle1_html = f"<span style='font-size:20px;'>📂 Group Name : {grp}</span>"
-        grptitle2_html = f"<span style='font-size:20px;'>⌛ Pending Task Count : {len(rows)}</span>"
-        grptitle3_html = f"<span style='font-size:20px;'>✅ Completed Task Count : {completedtaskcount}</span>"
-        grptitle4_html = f"<span style='font-size:20px;color:orange;'>⚠️ It seems you have {len(rows)} active tasks in {grp}. Consider clearing up some to avoid burnout 😴</span>"
-        ptingrp = len(rows)
-        with st.expander(expander_label, expanded=True):
-            col1, col2, col3, col4 = st.columns([0.25, 0.25, 0.5, 1])
-            with col1: st.markdown(grptitle1_html, unsafe_allow_html=True)
-            with col2: st.markdown(grptitle2_html, unsafe_allow_html=True)
-            with col3: st.markdown(grptitle3_html, unsafe_allow_html=True)
-            if len(rows) > 4:
-                with col4: st.markdown(grptitle4_html, unsafe_allow_html=True)
-
-            # Delete all group tasks if too many
-            if ptingrp > 3:
-                delete_group_completed(grp, tasks_ref, unique_id=grp, db=db)
-
-            h = st.columns([0.28,0.28,0.16,0.10,0.08,0.10])
-            h[0].markdown("**Task Name**"); h[1].markdown("**Task Description**")
-            h[2].markdown("**Elapsed Time**"); h[3].markdown("**Edit Description**")
-            h[4].markdown("**Delete**"); h[5].markdown("**Completed ?**")
-
-            for doc_id, info in rows:
-                if f"edit_{doc_id}" not in st.session_state:
-                    st.session_state[f"edit_{doc_id}"] = False
-
-                ts = info.get("timestamp")
-                c = st.columns([0.28,0.28,0.16,0.10,0.08,0.10])
-                c[0].write(info.get("task","—"))
-                c[1].write(info.get("comment","—"))
-                c[2].write(fmt_elapsed_since(ts))
-
-                if c[3].button("✏️", key=f"edit_btn_{doc_id}"):
-                    st.session_state[f"edit_{doc_id}"] = True
-
-                if c[4].button("❌️", key=f"del_{doc_id}"):
-                    delete_task(doc_id, info.get("task",""), tasks_ref)
-
-                new_val = c[5].checkbox("", value=info.get("completed",False), key=f"chk_{doc_id}")
-                if new_val != info.get("completed",False):
-                    payload = {"completed": new_val}
-                    if new_val: payload["completed_time"] = datetime.utcnow()
-                    else: payload["completed_time"] = firestore.DELETE_FIELD
-                    tasks_ref.document(doc_id).update(payload)
-                    st.rerun()
-
-                if st.session_state.get(f"edit_{doc_id}", False):
-                    ec1, ec2 = st.columns([0.8, 0.2])
-                    new_comment = ec1.text_input("New Description", value=info.get("comment",""), key=f"comm_{doc_id}")
-                    mark_completed = ec2.checkbox("Mark as completed", value=False, key=f"complete_{doc_id}")
-                    if st.button("💾 Save", key=f"save_{doc_id}"):
-                        update_payload = {"comment": new_comment}
-                        if mark_completed:
-                            update_payload["completed"] = True
-                            update_payload["completed_time"] = datetime.utcnow()
-                        tasks_ref.document(doc_id).update(update_payload)
-                        st.toast("✅ Updated.")
-                        st.session_state[f"edit_{doc_id}"] = False
-                        st.rerun()
-
-    getallpendingtaskscount = get_allpending_count_from_firestore()
+    for grp in groups:
+        _pending_group(store, nickname, tasks, grp)
+
+    getallpendingtaskscount = tasks.count(completed=False)
     if getallpendingtaskscount > 4:
-        delete_all_completed(tasks_ref, unique_id="main_app", db=db)
+        delete_all_completed(store, nickname, unique_id="main_app", expected=getallpendingtaskscount)
+
+@st.fragment
+@metered_fragment("pending_group")
+def _pending_group(store, nickname, tasks, grp):
+    _show_notice()
+    ptingrp = tasks.count(completed=False, group=grp)
+    completedtaskcount = tasks.count(completed=True, group=grp)
+    expander_label = f" ▶ {grp}"
+    grptitle1_html = f"<span style='font-size:20px;'>📂 Group Name : {grp}</span>"
+    grptitle2_html = f"<span style='font-size:20px;'>⌛ Pending Task Count : {ptingrp}</span>"
+    grptitle3_html = f"<span style='font-size:20px;'>✅ Completed Task Count : {completedtaskcount}</span>"
+    grptitle4_html = f"<span style='font-size:20px;color:orange;'>⚠️ It seems you have {ptingrp} active tasks in {grp}. Consider clearing up some to avoid burnout 😴</span>"
+    with st.expander(expander_label, key=_expander_key(False, grp), on_change="rerun") as exp:
+        if not exp.open:
+            return
+        col1, col2, col3, col4 = st.columns([0.25, 0.25, 0.5, 1])
+        with col1: st.markdown(grptitle1_html, unsafe_allow_html=True)
+        with col2: st.markdown(grptitle2_html, unsafe_allow_html=True)
+        with col3: st.markdown(grptitle3_html, unsafe_allow_html=True)
+        if ptingrp > 4:
+            with col4: st.markdown(grptitle4_html, unsafe_allow_html=True)
+
+        # Delete all group tasks if too many
+        if ptingrp > 3:
+            delete_group_completed(grp, store, nickname, unique_id=grp, expected=ptingrp)
+
+        h = st.columns([0.28,0.28,0.16,0.10,0.08,0.10])
+        h[0].markdown("**Task Name**"); h[1].markdown("**Task Description**")
+        h[2].markdown("**Elapsed Time**"); h[3].markdown("**Edit Description**")
+        h[4].markdown("**Delete**"); h[5].markdown("**Completed ?**")
+
+        rows, next_cursor = page_rows(tasks, False, grp)
+        comments = load_comments(store, nickname, rows)
+        for doc_id, info in rows:
+            if f"edit_{doc_id}" not in st.session_state:
+                st.session_state[f"edit_{doc_id}"] = False
+
+            ts = info.get("timestamp")
+            c = st.columns([0.28,0.28,0.16,0.10,0.08,0.10])
+            c[0].write(info.get("task","—"))
+            c[1].write(comments.get(doc_id, "—"))
+            c[2].write(fmt_elapsed_since(ts))
+
+            if c[3].button("✏️", key=f"edit_btn_{doc_id}"):
+                st.session_state[f"edit_{doc_id}"] = True
+
+            c[4].button("❌️", key=f"del_{doc_id}", on_click=_on_delete, args=(doc_id, info, store, nickname, tasks))
+
+            c[5].checkbox("", value=info.get("completed",False), key=f"chk_{doc_id}",
+                          on_change=_on_toggle, args=(doc_id, info, f"chk_{doc_id}", store, nickname, tasks))
+
+            if st.session_state.get(f"edit_{doc_id}", False):
+                ec1, ec2 = st.columns([0.8, 0.2])
+                comment = comments.get(doc_id, "")
+                ec1.text_input("New Description", value=comment, key=f"comm_{doc_id}")
+                ec2.checkbox("Mark as completed", value=False, key=f"complete_{doc_id}")
+                st.button("💾 Save", key=f"save_{doc_id}", on_click=_on_save,
+                          args=(doc_id, {**info, "comment": comment}, store, nickname, tasks))
+        render_pager(False, grp, next_cursor)
 
 # ------------------------------ Completed Tasks Renderer
-def render_completed(tasks_ref,db):
-    docs = list(tasks_ref.where("completed", "==", True).stream())
-    if not docs:
+def render_completed(store, nickname, tasks, archive=None):
+    archive = archive or {}
+    groups = list(tasks.groups_with(completed=True))
+    groups += sorted(g for g, v in archive.items() if v.get("count") and g not in groups)
+    if not groups:
         st.info("✅ No completed tasks.")
         return
 
-    grouped = {}
-    for d in docs:
-        info = d.to_dict()
-        ts, ct = info.get("timestamp"), info.get("completed_time")
-        grouped.setdefault(info.get("group","General"), []).append((d.id,{
-            "Task": info.get("task",""), "Comment": info.get("comment",""),
-            "Added": safe_dt_str(ts), "Completed": safe_dt_str(ct),
-            "Duration": str(ct-ts).split(".")[0] if ts and ct else "N/A",
-        }))
-
-    for grp, rows in grouped.items():
-        pendingtaskcount = get_pending_count_from_firestore(grp)
-        expander_label = f" ▶ {grp}"
-        grptitle1_html = f"<span style='font-size:20px;'>📂 Group Name : {grp}</span>"
-        grptitle2_html = f"<span style='font-size:20px;'>✅ Completed Task Count : {len(rows)}</span>"
-        grptitle3_html = f"<span style='font-size:20px;'>⌛ Pending Task Count : {pendingtaskcount}</span>"
-
-        with st.expander(expander_label, expanded=True):
-            col1, col2, col3 = st.columns([0.2, 0.2, 1])
-            with col1: st.markdown(grptitle1_html, unsafe_allow_html=True)
-            with col2: st.markdown(grptitle2_html, unsafe_allow_html=True)
-            with col3: st.markdown(grptitle3_html, unsafe_allow_html=True)
-
-            # Header row
-            h = st.columns([0.26, 0.26, 0.16, 0.16, 0.10, 0.06])
-            headers = ["Task Name", "Task Description", "Added Date", "Completed Date", "Duration", "Completed?"]
-            for i, title in enumerate(headers):
-                h[i].markdown(f"<div class='task-row task-header'>{title}</div>", unsafe_allow_html=True)
-
-            # Data rows
-            for doc_id, row in rows:
-                c = st.columns([0.26, 0.26, 0.16, 0.16, 0.10, 0.06])
-
-                c[0].markdown(f"<div class='task-row'>{row.get('Task', '—')}</div>", unsafe_allow_html=True)
-                c[1].markdown(f"<div class='task-row'>{row.get('Comment', '—')}</div>", unsafe_allow_html=True)
-                c[2].markdown(f"<div class='task-row'>{row.get('Added', '—')}</div>", unsafe_allow_html=True)
-                c[3].markdown(f"<div class='task-row'>{row.get('Completed', '—')}</div>", unsafe_allow_html=True)
-                c[4].markdown(f"<div class='task-row'>{row.get('Duration', '—')}</div>", unsafe_allow_html=True)
-
-                # Interactive checkbox
-                new_val = c[5].checkbox("", value=bool(row.get("Completed")), key=f"compchk_{doc_id}")
-                if not new_val and row.get("Completed"):
-                    tasks_ref.document(doc_id).update({"completed": False, "completed_time": firestore.DELETE_FIELD})
-                    st.success("↩️ Moved back to Pending.")
-                    st.rerun()
+    for grp in groups:
+        _completed_group(store, nickname, tasks, grp, archive.get(grp, {}).get("count", 0))
+
+@st.fragment
+@metered_fragment("completed_group")
+def _completed_group(store, nickname, tasks, grp, archived=0):
+    _show_notice()
+    ctingrp = tasks.count(completed=True, group=grp) + archived
+    pendingtaskcount = tasks.count(completed=False, group=grp)
+    expander_label = f" ▶ {grp}"
+    grptitle1_html = f"<span style='font-size:20px;'>📂 Group Name : {grp}</span>"
+    grptitle2_html = f"<span style='font-size:20px;'>✅ Completed Task Count : {ctingrp}</span>"
+    grptitle3_html = f"<span style='font-size:20px;'>⌛ Pending Task Count : {pendingtaskcount}</span>"
+
+    with st.expander(expander_label, key=_expander_key(True, grp), on_change="rerun") as exp:
+        if not exp.open:
+            return
+        col1, col2, col3 = st.columns([0.2, 0.2, 1])
+        with col1: st.markdown(grptitle1_html, unsafe_allow_html=True)
+        with col2: st.markdown(grptitle2_html, unsafe_allow_html=True)
+        with col3: st.markdown(grptitle3_html, unsafe_allow_html=True)
+
+        # Header row
+        h = st.columns([0.26, 0.26, 0.16, 0.16, 0.10, 0.06])
+        headers = ["Task Name", "Task Description", "Added Date", "Completed Date", "Duration", "Completed?"]
+        for i, title in enumerate(headers):
+            h[i].markdown(f"<div class='task-row task-header'>{title}</div>", unsafe_allow_html=True)
+
+        # Data rows
+        rows, next_cursor = page_rows(tasks, True, grp)
+        comments = load_comments(store, nickname, rows)
+        for doc_id, info in rows:
+            # Timestamps are datetimes already (storage.base.Task).
+            ts, ct = info.get("timestamp"), info.get("completed_time")
+            cells = (info.get("task", ""), comments.get(doc_id, ""), safe_dt_str(ts), safe_dt_str(ct),
+                     str(ct - ts).split(".")[0] if ts and ct else "N/A")
+            c = st.columns([0.26, 0.26, 0.16, 0.16, 0.10, 0.06])
+            for col, text in zip(c, cells):
+                col.markdown(f"<div class='task-row'>{text}</div>", unsafe_allow_html=True)
+
+            # Interactive checkbox
+            c[5].checkbox("", value=bool(info.get("completed", False)), key=f"compchk_{doc_id}",
+                          on_change=_on_toggle, args=(doc_id, info, f"compchk_{doc_id}", store, nickname, tasks))
+        render_pager(True, grp, next_cursor)
+
+        if archived and st.toggle(f"🗄️ Show {archived} archived tasks", key=f"arch_{grp}"):
+            _archived_rows(store, nickname, grp)
+
+def _archived_rows(store, nickname, grp):
+    # Read only while the toggle is on: the monthly summaries and one page of
+    # archived tasks, side by side.
+    archived = ArchivedTasks(store, nickname)
+    cursor = page_cursor(True, grp, "archived")
+    months, fetched = gather(lambda: store.archive_summaries(nickname, grp),
+                             lambda: archived.page(True, grp, PAGE_SIZE, cursor))
+    st.dataframe([
+        {"Month": m["month"], "Tasks": m["count"], "Total Duration": fmt_seconds(m["seconds"]),
+         "Average Duration": fmt_seconds(m["seconds"] / m["count"] if m["count"] else None)}
+        for m in months
+    ], hide_index=True, width="stretch")
+
+    rows, next_cursor = page_rows(archived, True, grp, name="archived", fetched=fetched)
+    st.dataframe([
+        {"Task": info.get("task", ""), "Description": info.get("comment", ""),
+         "Added": safe_dt_str(info.get("timestamp")), "Completed": safe_dt_str(info.get("completed_time")),
+         "Duration": fmt_seconds(task_duration(info))}
+        for _, info in rows
+    ], hide_index=True, width="stretch")
+    render_pager(True, grp, next_cursor, name="archived")
@@ -0,0 +1,119 @@
+import hashlib, os
+import pytest
+from streamlit.testing.v1 import AppTest
+import auth, storage
+from storage.sqlite import SqliteStore
+from utils import hash_password, verify_password, needs_rehash
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+NOW = 1_700_000_000
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = SqliteStore(str(tmp_path / "todo.db"))
+    store.create_user("ann", {"password_hash": hash_password("pw", 1000), "created_at": None})
+    monkeypatch.setattr(storage, "_store", store)
+    monkeypatch.setattr(auth, "_SECRET", b"test-secret")
+    monkeypatch.setattr(auth, "_verified", type(auth._verified)())
+    return store
+
+# ------------------------------ Session Tokens
+def test_token_round_trip(store):
+    assert auth.verify_token(auth.issue_token("ann", now=NOW), now=NOW + 1) == "ann"
+
+def test_expired_token(store):
+    token = auth.issue_token("ann", now=NOW)
+    assert auth.verify_token(token, now=NOW + auth.SESSION_TTL_SECONDS) is None
+
+@pytest.mark.parametrize("tamper", [
+    lambda t: t[:-2] + ("AA" if not t.endswith("AA") else "BB"),    # signature
+    lambda t: t.replace(".0.", ".1.", 1),                           # epoch
+    lambda t: t.replace(t.split(".")[2], str(int(t.split(".")[2]) + 3600)),   # expiry
+    lambda t: auth.issue_token("bob", now=NOW).split(".")[0] + t[t.index("."):],   # nickname
+    lambda t: t + "é",
+    lambda t: "é.0.1.x",
+    lambda t: "garbage",
+])
+def test_tampered_token(store, tamper):
+    store.create_user("bob", {"password_hash": "x", "created_at": None})
+    assert auth.verify_token(tamper(auth.issue_token("ann", now=NOW)), now=NOW + 1) is None
+
+def test_wrong_secret(store, monkeypatch):
+    token = auth.issue_token("ann", now=NOW)
+    monkeypatch.setattr(auth, "_SECRET", b"other-secret")
+    assert auth.verify_token(token, now=NOW + 1) is None
+
+def test_no_secret_no_tokens(store, monkeypatch):
+    token = auth.issue_token("ann", now=NOW)
+    monkeypatch.setattr(auth, "_SECRET", b"")
+    with pytest.raises(ValueError):
+        auth.issue_token("ann")
+    assert auth.verify_token(token, now=NOW + 1) is None
+
+def test_revoked_token(store):
+    token = auth.issue_token("ann", now=NOW)
+    store.revoke_sessions("ann")
+    assert auth.verify_token(token, now=NOW + 1) is None
+    fresh = auth.issue_token("ann", store.get_user("ann")["session_epoch"], now=NOW)
+    assert auth.verify_token(fresh, now=NOW + 1) == "ann"
+
+def test_unknown_user(store):
+    assert auth.verify_token(auth.issue_token("nobody", now=NOW), now=NOW + 1) is None
+
+# ------------------------------ Passwords
+def test_verify_password():
+    stored = hash_password("pw", 1000)
+    assert verify_password("pw", stored)
+    assert not verify_password("PW", stored)
+    assert verify_password("pw", hashlib.sha256(b"pw").hexdigest())
+    assert not verify_password("pw", hashlib.sha256(b"other").hexdigest())
+    assert not verify_password("pw", None)
+
+def test_needs_rehash():
+    assert needs_rehash(hashlib.sha256(b"pw").hexdigest())
+    assert needs_rehash(hash_password("pw", 1000))
+    assert not needs_rehash(hash_password("pw"))
+
+# ------------------------------ Login / Logout
+def _login(at, nickname, password):
+    at.text_input(key="login_nick").input(nickname)
+    at.text_input(key="login_pwd").input(password)
+    return next(b for b in at.button if b.label == "Login").click().run()
+
+@pytest.mark.parametrize("legacy", [hashlib.sha256(b"pw").hexdigest(), hash_password("pw", 1000)])
+def test_login_rehashes(store, legacy):
+    store.set_password_hash("ann", legacy)
+    at = AppTest.from_file(MAIN, default_timeout=60)
+    at.run()
+    _login(at, "ann", "pw")
+    assert at.session_state["authenticated"]
+    stored = store.get_user("ann")["password_hash"]
+    assert not needs_rehash(stored) and verify_password("pw", stored)
+
+def test_wrong_password_keeps_hash(store):
+    before = store.get_user("ann")["password_hash"]
+    at = AppTest.from_file(MAIN, default_timeout=60)
+    at.run()
+    _login(at, "ann", "nope")
+    assert not at.session_state["authenticated"]
+    assert store.get_user("ann")["password_hash"] == before
+
+def test_logout_revokes_url_token(store):
+    at = AppTest.from_file(MAIN, default_timeout=60)
+    at.run()
+    _login(at, "ann", "pw")
+    token = at.query_params["session"]
+    resumed = AppTest.from_file(MAIN, default_timeout=60)
+    resumed.query_params["session"] = token
+    resumed.run()
+    assert resumed.session_state["nickname"] == "ann"
+
+    next(b for b in at.button if "Logout" in b.label).click().run()
+    assert "session" not in at.query_params
+    assert auth.verify_token(token) is None
+
+    # A fresh session opened from the copied URL lands on the login page.
+    again = AppTest.from_file(MAIN, default_timeout=60)
+    again.query_params["session"] = token
+    again.run()
+    assert not again.session_state["authenticated"]
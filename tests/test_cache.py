@@ -0,0 +1,53 @@
+import random
+from datetime import datetime
+import pytest
+from storage.base import ROW_FIELDS
+from storage.cache import CachedStore, cache_stats, invalidate
+from storage.sqlite import SqliteStore
+
+@pytest.fixture
+def stores(tmp_path):
+    raw = SqliteStore(str(tmp_path / "todo.db"))
+    nickname = tmp_path.name   # cache entries are process-wide
+    batch = raw.batch(nickname)
+    for i in range(40):
+        batch.add({"task": f"t{i}", "group": f"g{i % 4}", "comment": "", "completed": i % 3 == 0,
+                   "timestamp": datetime(2024, 1, 1, 0, i)})
+    batch.commit()
+    yield raw, CachedStore(raw), nickname
+    invalidate(nickname)
+
+def _rows(store, nickname):
+    return sorted((doc_id, sorted(info.items())) for doc_id, info in store.list_tasks(nickname, fields=ROW_FIELDS))
+
+def test_batches_patch_cached_rows_and_stats(stores):
+    raw, cached, nickname = stores
+    rng = random.Random(0)
+    cached.list_tasks(nickname, fields=ROW_FIELDS), cached.load_stats(nickname)
+    before = cache_stats()
+    for _ in range(30):
+        ids = [doc_id for doc_id, _ in cached.list_tasks(nickname, fields=ROW_FIELDS)]
+        batch = cached.batch(nickname)
+        batch.add({"task": "new", "group": f"g{rng.randrange(6)}", "completed": False, "timestamp": datetime.utcnow()})
+        batch.update(rng.choice(ids), {"completed": rng.random() < 0.5, "task": "edited"})
+        batch.delete(rng.choice(ids[:5]))
+        batch.commit()
+        assert _rows(cached, nickname) == _rows(raw, nickname)
+        assert cached.load_stats(nickname) == raw.load_stats(nickname)
+    after = cache_stats()
+    assert after["misses"] == before["misses"]
+    assert after["patches"] > before["patches"]
+
+def test_write_outside_the_cache_falls_back(stores):
+    raw, cached, nickname = stores
+    cached.list_tasks(nickname, fields=ROW_FIELDS)
+    doc_id = _rows(raw, nickname)[0][0]
+    raw_batch = raw.batch(nickname)
+    raw_batch.delete(doc_id)
+    raw_batch.commit()
+    # Deleting it again reports it missing, so the cached rows are dropped.
+    batch = cached.batch(nickname)
+    batch.delete(doc_id)
+    batch.commit()
+    assert batch.missing == [doc_id]
+    assert _rows(cached, nickname) == _rows(raw, nickname)
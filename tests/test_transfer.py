@@ -0,0 +1,38 @@
+import csv, io, json
+import pytest
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+from storage.sqlite import SqliteStore
+from transfer import FIELDS, export_file, import_tasks
+
+ROWS = "task,group,comment,completed,timestamp,completed_time\n" \
+       "Write report,Work,Fält ✓,true,2024-05-01T09:00:00,2024-05-02T10:00:00\n" \
+       "Buy milk,,,false,2024-05-03T08:00:00,\n"
+
+@pytest.fixture
+def store(tmp_path):
+    store = SqliteStore(str(tmp_path / "todo.db"))
+    store.create_user("ann", {"password_hash": "x", "created_at": None})
+    imported, skipped, errors = import_tasks(store, "ann", io.StringIO(ROWS), "csv")
+    assert (imported, skipped, errors) == (2, 0, [])
+    return store
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_export_goes_through_download_conversion(store, fmt):
+    # What st.download_button does with the callable it is given.
+    data = (lambda: export_file(store, "ann", fmt))()
+    body, _ = convert_data_to_bytes_and_infer_mime(data, RuntimeError("unsupported type"))
+    text = body.decode("utf-8")
+    if fmt == "csv":
+        rows = list(csv.DictReader(io.StringIO(text)))
+        assert tuple(rows[0]) == FIELDS
+    else:
+        rows = [json.loads(line) for line in text.splitlines()]
+    assert [r["task"] for r in rows] == ["Write report", "Buy milk"]
+    assert rows[0]["comment"] == "Fält ✓"
+
+def test_export_round_trips(store, tmp_path):
+    other = SqliteStore(str(tmp_path / "other.db"))
+    data = export_file(store, "ann", "jsonl")
+    imported, skipped, _ = import_tasks(other, "ann", io.StringIO(data.decode()), "jsonl")
+    assert (imported, skipped) == (2, 0)
+    assert export_file(other, "ann", "jsonl") == data
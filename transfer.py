@@ -0,0 +1,181 @@
+import argparse, csv, io, json, sys
+from datetime import datetime, timezone
+from config import BULK_CHUNK_SIZE, PAGE_SIZE
+from utils import format_task_timestamp, to_datetime
+
+# ------------------------------ Task File Format
+# One task per CSV row / JSONL line with the fields add_new_task writes.
+# Timestamps are ISO 8601 in UTC; created_str is derived on import.
+FIELDS = ("task", "group", "comment", "completed", "timestamp", "completed_time")
+FORMATS = ("csv", "jsonl")
+MAX_ERRORS = 100
+
+_TRUE  = {"1", "true", "yes", "y"}
+_FALSE = {"", "0", "false", "no", "n"}
+
+def _utc(ts):
+    ts = to_datetime(ts)
+    if ts is not None and ts.tzinfo:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+def _iso(ts):
+    ts = _utc(ts)
+    return ts.isoformat(timespec="microseconds") if ts else ""
+
+def _flag(value):
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in _TRUE: return True
+    if value in _FALSE: return False
+    raise ValueError(f"completed must be true/false, got {value!r}")
+
+def task_from_record(rec):
+    # Raises ValueError for records add_new_task would not have written.
+    name = str(rec.get("task") or "").strip()
+    if not name:
+        raise ValueError("task name is empty")
+    raw = rec.get("timestamp")
+    created = _utc(raw) if raw else datetime.utcnow()
+    if created is None:
+        raise ValueError(f"bad timestamp {rec.get('timestamp')!r}")
+    doc = {
+        "task": name,
+        "group": str(rec.get("group") or "").strip() or "General",
+        "comment": str(rec.get("comment") or "").strip(),
+        "completed": _flag(rec.get("completed", False)),
+        "timestamp": created,
+        "created_str": format_task_timestamp(created),
+    }
+    if doc["completed"]:
+        raw = rec.get("completed_time")
+        done_at = _utc(raw) if raw else created
+        if done_at is None:
+            raise ValueError(f"bad completed_time {rec.get('completed_time')!r}")
+        doc["completed_time"] = done_at
+    return doc
+
+def record_from_task(info):
+    rec = {f: info.get(f) for f in FIELDS}
+    rec["group"] = rec["group"] or "General"
+    rec["comment"] = rec["comment"] or ""
+    rec["completed"] = bool(rec["completed"])
+    rec["timestamp"] = _iso(rec["timestamp"])
+    rec["completed_time"] = _iso(rec["completed_time"]) if rec["completed"] else ""
+    return rec
+
+# ------------------------------ Readers
+# Both yield (line_number, record) one row at a time from a text stream.
+def read_csv(fh):
+    reader = csv.DictReader(fh)
+    missing = {"task"} - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"CSV header is missing: {', '.join(sorted(missing))}")
+    for rec in reader:
+        yield reader.line_num, rec
+
+def read_jsonl(fh):
+    for n, line in enumerate(fh, 1):
+        if not line.strip():
+            continue
+        try:
+            rec = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield n, e
+            continue
+        yield n, rec if isinstance(rec, dict) else ValueError("line is not a JSON object")
+
+_READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+# ------------------------------ Import
+def import_tasks(store, nickname, fh, fmt, chunk_size=BULK_CHUNK_SIZE, progress=None):
+    # Streams fh into the user's tasks, one batch per chunk_size valid rows.
+    # Bad rows are skipped; returns (imported, skipped, [(line, message), ...])
+    # with at most MAX_ERRORS messages.
+    errors, imported, skipped = [], 0, 0
+    batch = store.batch(nickname)
+    for line, rec in _READERS[fmt](fh):
+        try:
+            if isinstance(rec, Exception):
+                raise rec
+            batch.add(task_from_record(rec))
+        except ValueError as e:
+            skipped += 1
+            if len(errors) < MAX_ERRORS:
+                errors.append((line, str(e)))
+            continue
+        if len(batch) >= chunk_size:
+            batch.commit()
+            imported += len(batch)
+            batch = store.batch(nickname)
+            if progress: progress(imported)
+    if len(batch):
+        batch.commit()
+        imported += len(batch)
+        if progress: progress(imported)
+    return imported, skipped, errors
+
+# ------------------------------ Export
+def iter_tasks(store, nickname, page_size=PAGE_SIZE * 20):
+    # Pages through the user's tasks in timestamp order.
+    cursor = None
+    while True:
+        rows, cursor = store.page_tasks(nickname, None, None, page_size, cursor, fields=FIELDS)
+        yield from rows
+        if cursor is None:
+            return
+
+def export_tasks(store, nickname, fh, fmt):
+    n = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(fh, fieldnames=FIELDS)
+        writer.writeheader()
+    for _, info in iter_tasks(store, nickname):
+        rec = record_from_task(info)
+        if fmt == "csv":
+            writer.writerow(rec)
+        else:
+            fh.write(json.dumps(rec) + "\n")
+        n += 1
+    return n
+
+def export_file(store, nickname, fmt):
+    # The export as bytes, the form st.download_button takes from a callable.
+    buf = io.BytesIO()
+    text = io.TextIOWrapper(buf, encoding="utf-8", newline="")
+    export_tasks(store, nickname, text, fmt)
+    text.flush()
+    text.detach()
+    return buf.getvalue()
+
+# ------------------------------ Command Line
+# python transfer.py export <nickname> [--format csv|jsonl] [--out FILE]
+# python transfer.py import <nickname> FILE [--format csv|jsonl]
+if __name__ == "__main__":
+    from storage import get_store
+
+    parser = argparse.ArgumentParser(description="Import or export a user's tasks as CSV or JSONL.")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("nickname")
+    parser.add_argument("file", nargs="?", default="-")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--out", default="-")
+    args = parser.parse_args()
+    path = args.file if args.action == "import" else args.out
+    fmt = args.format or ("jsonl" if path.endswith((".jsonl", ".json")) else "csv")
+    store = get_store()
+
+    if args.action == "export":
+        fh = sys.stdout if path == "-" else open(path, "w", encoding="utf-8", newline="")
+        with fh:
+            n = export_tasks(store, args.nickname, fh, fmt)
+        print(f"{args.nickname}: exported {n} tasks", file=sys.stderr)
+    else:
+        fh = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+        with fh:
+            n, skipped, errors = import_tasks(store, args.nickname, fh, fmt,
+                                     progress=lambda done: print(f"  {done} imported", file=sys.stderr))
+        for line, msg in errors:
+            print(f"line {line}: {msg}", file=sys.stderr)
+        print(f"{args.nickname}: imported {n} tasks, skipped {skipped}", file=sys.stderr)
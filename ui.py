@@ -1,6 +1,17 @@
+import logging
 import streamlit as st
-import matplotlib.pyplot as plt
-import seaborn as sns
+from charts import status_pie
+from live import detach_live_tasks
+from auth import end_session
+from mutations import flush_queue
+from search import drop_index
+from storage import get_store
+from metering import last_rerun_meter, metered_fragment
+from storage.cache import cache_stats
+from stats import GroupIndex, with_archive
+from config import DEBUG_PANEL, READ_BUDGET, STATUS_REFRESH_SECONDS
+
+logger = logging.getLogger(__name__)
 
 def setup_page():
     st.set_page_config(page_title="Wickz Day Planner", layout="wide")
@@ -8,63 +19,86 @@ def setup_page():
         <style>.custom-button {font-size: 18px;font-weight: bold;background-color: #4CAF50;color: white;border-radius: 12px;padding: 8px 24px;}</style>
     """, unsafe_allow_html=True)
 
-def sidebar(nickname, tasks_ref, db):
-    docs_all = list(tasks_ref.stream())
-    pending_count, completed_count = 0, 0
-    group_stats = {}
-
-    for d in docs_all:
-        info = d.to_dict()
-        grp  = info.get("group", "General")
-        done = info.get("completed", False)
-        if done: completed_count += 1
-        else: pending_count += 1
-        group_stats.setdefault(grp, {"total": 0, "completed": 0})
-        group_stats[grp]["total"]     += 1
-        group_stats[grp]["completed"] += int(done)
-
-    overall_count = pending_count + completed_count
-
+def sidebar(nickname, tasks, archive=None):
     with st.sidebar:
         st.markdown(f"# Welcome Back {nickname}")
-        if st.button("🔁 Refresh"): st.rerun()
+        if st.button("🔁 Refresh"):
+            drop_index()
+            st.rerun()
         if st.button("🚪 Logout"):
+            # Queued changes that cannot be written must not keep the user in.
+            try:
+                flush_queue(get_store(), nickname)
+            except Exception:
+                logger.warning("dropping queued changes of %s at logout", nickname, exc_info=True)
+            detach_live_tasks()
+            end_session(nickname)
             st.session_state.clear()
             st.rerun()
 
         st.markdown("---")
-        st.markdown("# 💻 Tasks Overview")
-        st.markdown(f"### 🔎 Total Tasks Count : {overall_count}")
-        st.markdown(f"#### ⌛ Pending Tasks Count : {pending_count}")
-        st.markdown(f"#### ✅ Completed Tasks Count : {completed_count}")
-        st.markdown("---")
+        _task_overview(tasks, archive)
 
-        st.markdown("# 📈 Tasks Status Overview")
-        options = ["All"] + list(group_stats.keys())
-        sel = st.selectbox("Select task group", options, key="pie_group")
-        if sel == "All":
-            total = sum(v["total"] for v in group_stats.values())
-            comp  = sum(v["completed"] for v in group_stats.values())
-        else:
-            total = group_stats.get(sel, {}).get("total", 0)
-            comp  = group_stats.get(sel, {}).get("completed", 0)
-
-        rem = total - comp
-        if total > 0:
-            fig, ax = plt.subplots(figsize=(4,4), facecolor="white")
-            ax.pie([comp, rem],
-                   labels=["Completed","Remaining"],
-                   autopct="%1.0f%%",
-                   startangle=90,
-                   colors=sns.color_palette("muted", 2),
-                   wedgeprops={"edgecolor":"white","linewidth":1.5})
-            ax.set_title(f"{sel} Tasks", pad=12)
-            ax.axis("equal")
-            st.pyplot(fig)
-        else:
-            st.info("No tasks to summarize.")
+        if DEBUG_PANEL:
+            usage_panel()
 
         st.markdown("---")
         st.markdown("<p style='font-size:12px;color:gray;text-align:center;'>&copy; 2025 Wickz Day Planner. All rights reserved.</p>", unsafe_allow_html=True)
 
-    return pending_count, completed_count
+@st.fragment(run_every=STATUS_REFRESH_SECONDS or None)
+@metered_fragment("overview")
+def _task_overview(tasks, archive):
+    # With TODO_STATUS_REFRESH_SECONDS, reruns on its own to pick up edits
+    # made inside the group fragments, which patch the same task view in place.
+    stats = with_archive(tasks.stats(), archive)
+    completed_count = stats["completed"]
+    pending_count   = stats["total"] - completed_count
+    group_stats     = stats["groups"]
+    overall_count   = pending_count + completed_count
+
+    st.markdown("# 💻 Tasks Overview")
+    st.markdown(f"### 🔎 Total Tasks Count : {overall_count}")
+    st.markdown(f"#### ⌛ Pending Tasks Count : {pending_count}")
+    st.markdown(f"#### ✅ Completed Tasks Count : {completed_count}")
+    st.markdown("---")
+
+    st.markdown("# 📈 Tasks Status Overview")
+    index = GroupIndex(stats)
+    names = index.names()
+    if len(names) > 20:
+        # Narrow long group lists server-side before building the options.
+        typed = st.text_input("Filter groups", key="pie_group_filter", placeholder="Group name starts with…")
+        if typed:
+            names = index.prefix(typed)
+    options = ["All"] + names
+    sel = st.selectbox("Select task group", options, key="pie_group")
+    if sel == "All":
+        total = sum(v["total"] for v in group_stats.values())
+        comp  = sum(v["completed"] for v in group_stats.values())
+    else:
+        total = group_stats.get(sel, {}).get("total", 0)
+        comp  = group_stats.get(sel, {}).get("completed", 0)
+
+    rem = total - comp
+    if total > 0:
+        st.image(status_pie(sel, comp, rem), width="stretch")
+    else:
+        st.info("No tasks to summarize.")
+
+def usage_panel():
+    st.markdown("---")
+    st.markdown("# 🧮 Firestore Usage")
+    meter = last_rerun_meter()
+    if meter is None:
+        st.caption("No completed rerun yet.")
+        return
+    totals = meter.totals()
+    st.markdown(f"#### Last rerun ({meter.scope}) : {totals['reads']} reads · {totals['writes']} writes · {totals['kib']} KiB · {totals['ms']} ms")
+    if READ_BUDGET and totals["reads"] > READ_BUDGET:
+        st.warning(f"⚠️ Over the read budget of {READ_BUDGET} reads per rerun.")
+    st.dataframe(meter.table(), hide_index=True, width="stretch")
+    cache = cache_stats()
+    shared = f"{cache['shared_hits']} shared hits · {cache['stale']} stale · " if cache["shared"] else ""
+    st.caption(f"Task cache (all sessions): {cache['hits']} hits · {shared}{cache['misses']} misses · "
+               f"{cache['hit_rate']:.0%} hit rate · {cache['entries']} entries · {cache['rows']:,} rows · "
+               f"{cache['invalidations']} invalidations · {cache['evictions']} evictions")
@@ -1,8 +1,34 @@
-import hashlib
+import hashlib, hmac, secrets
 from datetime import datetime, timedelta, timezone
+from config import PASSWORD_ITERATIONS
 
-def hash_password(pwd: str) -> str:
-    return hashlib.sha256(pwd.encode()).hexdigest()
+# ------------------------------ Passwords
+# Salted PBKDF2-SHA256, stored as "pbkdf2_sha256$<iterations>$<salt>$<hex>",
+# so the cost can be raised without invalidating existing hashes. Accounts
+# created before then hold a bare SHA-256 hex digest, still accepted. Both
+# kinds are rehashed at the current cost on the next login (auth.login).
+_PBKDF2 = "pbkdf2_sha256"
+
+def hash_password(pwd: str, iterations: int = PASSWORD_ITERATIONS) -> str:
+    salt = secrets.token_hex(16)
+    digest = hashlib.pbkdf2_hmac("sha256", pwd.encode(), salt.encode(), iterations).hex()
+    return f"{_PBKDF2}${iterations}${salt}${digest}"
+
+def verify_password(pwd: str, stored) -> bool:
+    if not isinstance(stored, str):
+        return False
+    if stored.startswith(_PBKDF2 + "$"):
+        _, iterations, salt, digest = stored.split("$")
+        computed = hashlib.pbkdf2_hmac("sha256", pwd.encode(), salt.encode(), int(iterations)).hex()
+    else:
+        computed = hashlib.sha256(pwd.encode()).hexdigest()
+    return hmac.compare_digest(computed, stored.rsplit("$", 1)[-1])
+
+def needs_rehash(stored) -> bool:
+    # Legacy digests and hashes made with fewer than PASSWORD_ITERATIONS.
+    if not stored.startswith(_PBKDF2 + "$"):
+        return True
+    return int(stored.split("$")[1]) < PASSWORD_ITERATIONS
 
 def format_task_timestamp(ts: datetime) -> str:
     if not isinstance(ts, datetime):
@@ -35,6 +61,12 @@ def fmt_elapsed_since(ts: datetime) -> str:
     minutes = (delta.seconds % 3600) // 60
     return f"{days:02d}d {hours:02d}:{minutes:02d}"
 
+def fmt_seconds(seconds) -> str:
+    if seconds is None:
+        return "N/A"
+    seconds = int(seconds)
+    return f"{seconds // 86400:02d}d {seconds % 86400 // 3600:02d}:{seconds % 3600 // 60:02d}"
+
 def safe_dt_str(dt: datetime) -> str:
     dt = to_datetime(dt)
     if dt: